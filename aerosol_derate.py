@@ -0,0 +1,196 @@
+import json
+import os
+
+import numpy as np
+
+# -------------------------------
+# Aerosol / PM2.5 Irradiance Derating
+# -------------------------------
+# The Ineichen clear-sky model assumes climatological (fairly clean) air, so
+# it overstates yield in polluted regions. This module reads gridded
+# satellite rasters from local files and derates the hourly dni/ghi/dhi
+# before plane-of-array transposition.
+#
+# Following Shen et al. (2018, JGR Atmospheres), PM2.5 is estimated from
+# top-of-atmosphere (TOA) reflectance rather than from a retrieved AOD
+# product. The paper fits a deep belief network to TOA bands, geometry and
+# meteorology. Those trained weights are not available here, so the model
+# is a calibrated linear combination of the TOA bands
+#     PM2.5 = intercept + sum(coef_b * TOA_b)
+# with coefficients loaded from JSON and fitted against local monitors. An
+# AOD raster can be used directly instead (PM2.5 = eta * AOD).
+#
+# Rasters are north-up grids stored as .npy (optionally 3-D with 12 monthly
+# bands first), each with a JSON sidecar holding "west", "north",
+# "cell_size" and optionally "nodata". They are opened memory-mapped, so
+# sampling touches only the cells it needs and grid-wide processing runs
+# window by window.
+
+PM25_PER_AOD = 60.0  # µg/m³ per unit AOD550, typical for South Asia
+BACKGROUND_AOD = 0.15  # aerosol load already in the Linke turbidity climatology
+BROADBAND_RATIO = 0.8  # broadband / 550 nm aerosol optical depth
+SINGLE_SCATTERING_ALBEDO = 0.9
+FORWARD_FRACTION = 0.8  # share of scattered light that still reaches the ground
+WINDOW = 1024
+
+
+class Raster:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.splitext(path)[0] + '.json') as f:
+            meta = json.load(f)
+        self.west = float(meta['west'])
+        self.north = float(meta['north'])
+        self.cell_size = float(meta['cell_size'])
+        self.nodata = meta.get('nodata')
+        self.data = np.load(path, mmap_mode='r')
+
+    @property
+    def shape(self):
+        return self.data.shape[-2:]
+
+    # Fractional (row, col) of coordinates, cell centres at integers
+    def _position(self, latitude, longitude):
+        row = (self.north - np.asarray(latitude, dtype=float)) / self.cell_size - 0.5
+        col = (np.asarray(longitude, dtype=float) - self.west) / self.cell_size - 0.5
+        return row, col
+
+    def _clean(self, values):
+        values = np.asarray(values, dtype=float)
+        if self.nodata is not None:
+            values = np.where(values == self.nodata, np.nan, values)
+        return values
+
+    # Bilinear sample at arrays of coordinates. Returns (..., n) for a
+    # banded raster (bands first), NaN outside the grid or on nodata.
+    def sample(self, latitude, longitude):
+        row, col = self._position(latitude, longitude)
+        row, col = np.atleast_1d(row), np.atleast_1d(col)
+        rows, cols = self.shape
+        inside = (row >= -0.5) & (row <= rows - 0.5) & (col >= -0.5) & (col <= cols - 0.5)
+        row = np.clip(row, 0, rows - 1)
+        col = np.clip(col, 0, cols - 1)
+        r0 = np.minimum(row.astype(int), max(rows - 2, 0))
+        c0 = np.minimum(col.astype(int), max(cols - 2, 0))
+        r1, c1 = np.minimum(r0 + 1, rows - 1), np.minimum(c0 + 1, cols - 1)
+        wr, wc = row - r0, col - c0
+
+        # Gather only the four neighbours of each point from the memmap
+        def cells(r, c):
+            return self._clean(self.data[..., r, c])
+
+        value = ((1 - wr) * (1 - wc) * cells(r0, c0) + (1 - wr) * wc * cells(r0, c1)
+                 + wr * (1 - wc) * cells(r1, c0) + wr * wc * cells(r1, c1))
+        return np.where(inside, value, np.nan)
+
+    # (row slice, col slice) tiles covering the grid
+    def windows(self, size=WINDOW):
+        rows, cols = self.shape
+        for top in range(0, rows, size):
+            for left in range(0, cols, size):
+                yield slice(top, min(top + size, rows)), slice(left, min(left + size, cols))
+
+    def read(self, window):
+        return self._clean(self.data[(...,) + tuple(window)])
+
+
+# Linear TOA-reflectance model; coefficients come from a JSON file like
+# {"intercept": 12.0, "bands": {"b1": 310.0, "b3": -95.0}}
+class ToaModel:
+    def __init__(self, intercept, coefficients):
+        self.intercept = float(intercept)
+        self.coefficients = dict(coefficients)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec['intercept'], spec['bands'])
+
+    def predict(self, bands):
+        pm25 = self.intercept
+        for name, coefficient in self.coefficients.items():
+            pm25 = pm25 + coefficient * np.asarray(bands[name], dtype=float)
+        return np.maximum(pm25, 0)
+
+
+def pm25_from_aod(aod, eta=PM25_PER_AOD):
+    return np.maximum(np.asarray(aod, dtype=float), 0) * eta
+
+
+def aod_from_pm25(pm25, eta=PM25_PER_AOD):
+    return np.maximum(np.asarray(pm25, dtype=float), 0) / eta
+
+
+# Write a PM2.5 grid for a whole raster set window by window into a .npy
+# memmap, so a national grid never has to fit in RAM. Pass either `aod` (a
+# Raster) or `toa` ({band: Raster}) with a ToaModel.
+def pm25_grid(out_path, aod=None, toa=None, model=None, eta=PM25_PER_AOD, window=WINDOW):
+    reference = aod if aod is not None else next(iter(toa.values()))
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32,
+                                    shape=reference.data.shape)
+    for tile in reference.windows(window):
+        if aod is not None:
+            values = pm25_from_aod(aod.read(tile), eta)
+        else:
+            values = model.predict({name: raster.read(tile) for name, raster in toa.items()})
+        out[(...,) + tile] = values
+    out.flush()
+    with open(os.path.splitext(out_path)[0] + '.json', 'w') as f:
+        json.dump({'west': reference.west, 'north': reference.north,
+                   'cell_size': reference.cell_size}, f)
+    return out_path
+
+
+# Kasten & Young (1989) relative airmass, NaN below the horizon
+def _airmass(zenith):
+    zenith = np.asarray(zenith, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        airmass = 1 / (np.cos(np.radians(zenith)) + 0.50572 * (96.07995 - zenith) ** -1.6364)
+    return np.where(zenith < 90, airmass, np.nan)
+
+
+# Derate clear-sky components for extra aerosol above the background.
+# Beam is attenuated with Beer-Lambert along the slant path; the scattered
+# part that is not absorbed or sent back to space is added to the diffuse.
+def derate_components(components, aod):
+    zenith = np.asarray(components['zenith'], dtype=float)
+    excess = np.maximum(np.asarray(aod, dtype=float) - BACKGROUND_AOD, 0) * BROADBAND_RATIO
+    transmittance = np.nan_to_num(np.exp(-excess * _airmass(zenith)), nan=1.0)
+    dni = np.asarray(components['dni'], dtype=float)
+    dni_derated = dni * transmittance
+    cos_zenith = np.maximum(np.cos(np.radians(zenith)), 0)
+    scattered = (dni - dni_derated) * cos_zenith * SINGLE_SCATTERING_ALBEDO * FORWARD_FRACTION
+    dhi = np.asarray(components['dhi'], dtype=float) + scattered
+    return dict(components, dni=dni_derated, dhi=dhi, ghi=dni_derated * cos_zenith + dhi)
+
+
+# Drop-in `components` callable for solar_batch / solar_core: wraps a base
+# clear-sky source and derates it with the aerosol load at each site. Pass
+# an AOD raster, or a PM2.5 raster (e.g. the output of pm25_grid). Banded
+# rasters with 12 bands are treated as monthly values.
+class AerosolDerate:
+    def __init__(self, base=None, aod=None, pm25=None, eta=PM25_PER_AOD):
+        if (aod is None) == (pm25 is None):
+            raise ValueError("Pass exactly one of aod or pm25")
+        import solar_batch
+
+        self.base = base or solar_batch.clearsky_components
+        self.raster = aod if aod is not None else pm25
+        self.is_pm25 = pm25 is not None
+        self.eta = eta
+
+    def site_aod(self, latitude, longitude):
+        value = self.raster.sample(latitude, longitude)[..., 0]
+        if self.is_pm25:
+            value = aod_from_pm25(value, self.eta)
+        return value
+
+    def __call__(self, times, latitude, longitude):
+        components = self.base(times, latitude, longitude)
+        aod = self.site_aod(latitude, longitude)
+        if np.ndim(aod):
+            aod = aod[times.month.to_numpy() - 1]  # monthly bands
+        if np.all(np.isnan(aod)):
+            return components  # outside the grid: keep clear-sky
+        return derate_components(components, np.nan_to_num(aod, nan=BACKGROUND_AOD))
@@ -0,0 +1,340 @@
+import argparse
+import atexit
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# -------------------------------
+# Performance Benchmarks
+# -------------------------------
+# Offline timings for the solar estimators, the LED model and the mood API,
+# kept in a JSON history so that slowdowns show up before they ship:
+#   python benchmark.py                  run everything, record, compare
+#   python benchmark.py --only pvlib_site heuristic_fleet
+#   python benchmark.py --no-record      compare without adding a run
+# Every benchmark runs in its own interpreter, so peak RSS belongs to that
+# benchmark alone. Wall time is the best of --repeat runs after a warm-up;
+# allocations are the tracemalloc peak of one extra run, measured separately
+# because tracing slows the code down. A metric that is worse than the
+# median of the recent history on this machine by more than --threshold
+# fails the run with exit status 1.
+
+HISTORY_FILE = 'benchmark_history.json'
+HISTORY_WINDOW = 5  # previous runs the baseline is taken from
+THRESHOLD = 0.25
+REPEAT = 3
+METRICS = ('per_item_s', 'peak_rss_mb', 'alloc_peak_mb')
+
+BENCHMARKS = {}
+
+
+# Register a benchmark. The decorated function does the setup and returns a
+# zero-argument callable doing `items` units of work, which is what is timed.
+def benchmark(name, items):
+    def register(setup):
+        BENCHMARKS[name] = (setup, items)
+        return setup
+    return register
+
+
+def _site(**overrides):
+    site = {'latitude': 26.91, 'longitude': 75.78, 'roof_area': 100.0,
+            'panel_efficiency': 18.0, 'performance_ratio': 0.75, 'year': 2024,
+            'tilt': 27.0, 'azimuth': 180.0}
+    site.update(overrides)
+    return site
+
+
+# Rooftops scattered around a city. Coordinates are snapped to 0.1°, so a
+# thousand sites share about a hundred clear-sky runs like a real fleet.
+def _sites(count, seed=0):
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'latitude': np.round(26.91 + rng.uniform(-0.5, 0.5, count), 1),
+        'longitude': np.round(75.78 + rng.uniform(-0.5, 0.5, count), 1),
+        'roof_area': rng.uniform(20, 200, count),
+        'panel_efficiency': rng.uniform(15, 22, count),
+        'performance_ratio': rng.uniform(0.7, 0.85, count),
+        'year': 2024,
+        'tilt': rng.uniform(0, 40, count),
+        'azimuth': rng.uniform(120, 240, count),
+    })
+
+
+# -------------------------------
+# Solar Estimators
+# -------------------------------
+
+# pvlib pipeline for one site without the on-disk cache, as a cold CLI run
+@benchmark('pvlib_site', items=1)
+def pvlib_site():
+    import solar_batch
+    import solar_core
+
+    site = _site()
+    return lambda: solar_core.estimate(site, 'pvlib',
+                                       components=solar_batch.clearsky_components)
+
+
+@benchmark('pvlib_1k_sites', items=1000)
+def pvlib_1k_sites():
+    import solar_batch
+
+    sites = _sites(1000)
+    return lambda: solar_batch.estimate_fleet(sites,
+                                              components=solar_batch.clearsky_components)
+
+
+@benchmark('heuristic_site', items=1000)
+def heuristic_site():
+    import solar_core
+
+    site = _site()
+
+    def run():
+        for _ in range(1000):
+            solar_core.estimate(site, 'heuristic')
+    return run
+
+
+@benchmark('heuristic_fleet', items=100000)
+def heuristic_fleet():
+    import solar_core
+
+    sites = _sites(100000)
+    return lambda: solar_core.estimate_heuristic_fleet(sites)
+
+
+# -------------------------------
+# LED Model
+# -------------------------------
+
+@benchmark('diode_current', items=10000000)
+def diode_current():
+    import led_model
+
+    rng = np.random.default_rng(0)
+    V = rng.uniform(0, 4, 10000000)
+    V_f, I_f, T = led_model.characteristics(
+        rng.integers(0, len(led_model.COLORS), V.size), rng.uniform(-20, 85, V.size),
+        rng.uniform(0, 1000, V.size))
+    return lambda: led_model.diode_current(V, V_f, I_f, T)
+
+
+@benchmark('solve_voltage', items=1000000)
+def solve_voltage():
+    import led_model
+
+    rng = np.random.default_rng(0)
+    currents = rng.uniform(0, 0.05, 1000000)
+    colors = rng.integers(0, len(led_model.COLORS), currents.size)
+    temps = rng.uniform(-20, 85, currents.size)
+    return lambda: led_model.solve_voltage(currents, colors, temps, R_s=5.0, R_sh=1e4)
+
+
+# -------------------------------
+# Mood API
+# -------------------------------
+
+# jee.py against a throwaway SQLite file through the Flask test client
+def _mood_client():
+    scratch = tempfile.mkdtemp(prefix='mood_benchmark_')
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    os.environ['MOOD_DATABASE_URI'] = 'sqlite:///' + os.path.join(scratch, 'bench.db')
+    import jee
+
+    with jee.app.app_context():
+        jee.init_db()
+    return jee.app.test_client()
+
+
+def _counter():
+    count = 0
+    while True:
+        count += 1
+        yield count
+
+
+# Both are dominated by one password hash per request (a tenth of a second
+# or more), so they take 20 requests to give a stable time per item
+@benchmark('register', items=20)
+def register():
+    client = _mood_client()
+    names = _counter()
+
+    def run():
+        for _ in range(20):
+            client.post('/register', json={'username': f'user{next(names)}',
+                                           'password': 'secret'})
+    return run
+
+
+@benchmark('login', items=20)
+def login():
+    client = _mood_client()
+    client.post('/register', json={'username': 'alice', 'password': 'secret'})
+
+    def run():
+        for _ in range(20):
+            client.post('/login', json={'username': 'alice', 'password': 'secret'})
+    return run
+
+
+@benchmark('log_mood', items=500)
+def log_mood():
+    client = _mood_client()
+    client.post('/register', json={'username': 'alice', 'password': 'secret'})
+
+    def run():
+        for _ in range(500):
+            client.post('/log_mood', json={'username': 'alice', 'mood': 'happy'})
+    return run
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+# Run one benchmark in this process and return its metrics
+def measure(name, repeat=REPEAT):
+    setup, items = BENCHMARKS[name]
+    run = setup()
+    run()  # warm-up: imports, caches, first-touch page faults
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    run()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    wall = min(timings)
+    return {
+        'wall_s': wall,
+        'per_item_s': wall / items,
+        'items_per_s': items / wall,
+        'peak_rss_mb': _peak_rss_mb(),
+        'alloc_peak_mb': alloc_peak / (1024 * 1024),
+    }
+
+
+# Run one benchmark in a fresh interpreter
+def measure_isolated(name, repeat=REPEAT):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name,
+                             '--repeat', str(repeat)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# -------------------------------
+# History and Regressions
+# -------------------------------
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    staging = path + '.tmp'
+    with open(staging, 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(staging, path)
+
+
+# Median of each metric over the last runs recorded on this machine
+def baseline(history, machine, name, window=HISTORY_WINDOW):
+    runs = [run['results'][name] for run in history
+            if run['machine'] == machine and name in run['results']][-window:]
+    if not runs:
+        return None
+    return {metric: statistics.median(run[metric] for run in runs) for metric in METRICS}
+
+
+# (name, metric, baseline, current, change) for every metric past threshold
+def regressions(results, history, machine, threshold=THRESHOLD):
+    found = []
+    for name, current in results.items():
+        reference = baseline(history, machine, name)
+        if reference is None:
+            continue
+        for metric in METRICS:
+            change = current[metric] / reference[metric] - 1 if reference[metric] else 0
+            if change > threshold:
+                found.append((name, metric, reference[metric], current[metric], change))
+    return found
+
+
+def machine_id():
+    return f"{platform.node()}-{platform.machine()}-py{platform.python_version()}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-record', action='store_true')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.repeat)))
+        return 0
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"⏱️ Running {name}...", file=sys.stderr)
+        results[name] = measure_isolated(name, args.repeat)
+
+    print(f"\n{'Benchmark':<18}{'Wall (s)':>12}{'Per item':>14}{'Items/s':>14}"
+          f"{'Peak RSS MB':>14}{'Alloc MB':>12}")
+    for name, metrics in results.items():
+        print(f"{name:<18}{metrics['wall_s']:>12.4f}{metrics['per_item_s']:>14.3e}"
+              f"{metrics['items_per_s']:>14.1f}{metrics['peak_rss_mb']:>14.1f}"
+              f"{metrics['alloc_peak_mb']:>12.1f}")
+
+    history = load_history(args.history)
+    machine = machine_id()
+    found = regressions(results, history, machine, args.threshold)
+    if not args.no_record:
+        history.append({'timestamp': datetime.now(timezone.utc).isoformat(),
+                        'machine': machine, 'results': results})
+        save_history(args.history, history)
+        print(f"\n📁 Results recorded in: {args.history}")
+
+    if found:
+        print(f"\n❌ {len(found)} regression(s) past {args.threshold:.0%}:")
+        for name, metric, reference, current, change in found:
+            print(f"   {name} {metric}: {reference:.4g} -> {current:.4g} (+{change:.0%})")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,65 @@
+import itertools
+import json
+import os
+import sqlite3
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, func, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+
+from mood_queue import MoodQueue, QueueFull
+from mood_writer import MoodBatchWriter, UserIdCache
+from password_hasher import PasswordHasher
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///mental_health.db'
+
+# Optional integer setting from the environment
+def env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('MOOD_DATABASE_URI',
+                                                        'sqlite:///mental_health.db')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'connect_args': {'timeout': 30, 'check_same_thread': False},
+}
+app.config['MOOD_BATCH_MAX_ROWS'] = 500
+app.config['MOOD_BATCH_MAX_DELAY_MS'] = 5
+# sync: /log_mood returns once the row is committed to SQLite
+# queue: /log_mood appends to a durable local log and returns 202; background
+#        consumers drain it into MoodLog (see mood_queue.py)
+app.config['MOOD_INGEST_MODE'] = os.environ.get('MOOD_INGEST_MODE', 'sync')
+app.config['MOOD_QUEUE_DIR'] = os.environ.get('MOOD_QUEUE_DIR', 'mood_queue')
+app.config['MOOD_QUEUE_MAX_PENDING'] = 100000
+app.config['MOOD_QUEUE_BATCH_ROWS'] = 500
+app.config['MOOD_QUEUE_RETRY_AFTER'] = 1  # seconds, sent with a 503 when full
+app.config['BULK_CHUNK_SIZE'] = 1000
+# Password hashing, tunable per deployment from the environment
+app.config['PASSWORD_HASH_BACKEND'] = os.environ.get('PASSWORD_HASH_BACKEND',
+                                                     'process')  # inline, thread or process
+app.config['PASSWORD_HASH_WORKERS'] = env_int('PASSWORD_HASH_WORKERS')  # None: os.cpu_count()
+# None: werkzeug's pbkdf2 default
+app.config['PASSWORD_HASH_ITERATIONS'] = env_int('PASSWORD_HASH_ITERATIONS')
 db = SQLAlchemy(app)
 
+# SQLite tuning: WAL lets readers run alongside the single writer, and
+# synchronous=FULL keeps every committed batch durable
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=FULL')
+        cursor.execute('PRAGMA busy_timeout=30000')
+        cursor.close()
+
 # User Model
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,13 +72,112 @@ class MoodLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     mood = db.Column(db.String(50), nullable=False)
-    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Set in Python so every row is stored as 'YYYY-MM-DD HH:MM:SS.ffffff';
+    # keyset pagination compares these strings
+    timestamp = db.Column(db.DateTime,
+                          default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    __table_args__ = (db.Index('ix_mood_log_user_timestamp', 'user_id', 'timestamp'),)
+
+# Per-user, per-day, per-mood counts, kept up to date on every insert so
+# analytics never have to scan MoodLog
+class MoodDailyRollup(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    mood = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+# Sequence number of the next queue record to apply, committed together with
+# the rows so a batch replayed after a crash is not inserted twice
+class MoodQueueOffset(db.Model):
+    queue = db.Column(db.String(50), primary_key=True)
+    seq = db.Column(db.Integer, nullable=False)
+
+# username -> user_id cache for the mood logging hot path
+def load_user_id(username):
+    with app.app_context():
+        return db.session.query(User.id).filter_by(username=username).scalar()
+
+user_ids = UserIdCache(load_user_id)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_user_id(mapper, connection, target):
+    user_ids.invalidate()
+
+# Insert a batch of MoodLog rows and their rollup counts in a single transaction
+def insert_moods(rows):
+    with app.app_context():
+        db.session.execute(MoodLog.__table__.insert(), rows)
+        update_rollups(rows)
+        db.session.commit()
+
+def update_rollups(rows):
+    counts = Counter((row['user_id'], row['timestamp'].date(), row['mood']) for row in rows)
+    rollup = MoodDailyRollup.__table__
+    upsert = sqlite_insert(rollup)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=['user_id', 'day', 'mood'],
+        set_={'total': rollup.c.total + upsert.excluded.total})
+    db.session.execute(upsert, [{'user_id': user_id, 'day': day, 'mood': mood, 'total': total}
+                                for (user_id, day, mood), total in counts.items()])
+
+# Create missing tables and indexes, and backfill the rollup table for a
+# database that already had mood logs before it existed
+def init_db():
+    db.create_all()
+    for index in MoodLog.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # Rows from the old CURRENT_TIMESTAMP default have no fractional seconds,
+    # which sorts them before a cursor for the same second and would make
+    # /mood_history return the same page forever
+    db.session.execute(text("UPDATE mood_log SET timestamp = timestamp || '.000000' "
+                            "WHERE length(timestamp) = 19"))
+    db.session.commit()
+    if db.session.query(MoodDailyRollup).first() is None:
+        day = func.date(MoodLog.timestamp)
+        backfill = (db.session.query(MoodLog.user_id, day, MoodLog.mood, func.count())
+                    .filter(MoodLog.timestamp.isnot(None))
+                    .group_by(MoodLog.user_id, day, MoodLog.mood))
+        db.session.execute(MoodDailyRollup.__table__.insert().from_select(
+            ['user_id', 'day', 'mood', 'total'], backfill))
+        db.session.commit()
+
+hasher = PasswordHasher(app.config['PASSWORD_HASH_BACKEND'],
+                        workers=app.config['PASSWORD_HASH_WORKERS'],
+                        iterations=app.config['PASSWORD_HASH_ITERATIONS'])
+
+mood_writer = MoodBatchWriter(insert_moods,
+                              max_rows=app.config['MOOD_BATCH_MAX_ROWS'],
+                              max_delay_ms=app.config['MOOD_BATCH_MAX_DELAY_MS'])
+
+# Queue consumer: rows come back from the log as JSON, starting at sequence
+# number first_seq. The queue runs a single consumer, which SQLite's single
+# writer and the in-order offset below both rely on. Rows up to the offset recorded with an earlier commit
+# are skipped, and the new offset is written in the same transaction.
+def consume_moods(rows, first_seq):
+    next_seq = first_seq + len(rows)
+    with app.app_context():
+        applied = db.session.get(MoodQueueOffset, 'mood_log')
+        rows = rows[max((applied.seq if applied else 0) - first_seq, 0):]
+        if rows:
+            rows = [dict(row, timestamp=parse_timestamp(row['timestamp'])) for row in rows]
+            db.session.execute(MoodLog.__table__.insert(), rows)
+            update_rollups(rows)
+        offset = sqlite_insert(MoodQueueOffset.__table__)
+        db.session.execute(offset.on_conflict_do_update(
+            index_elements=['queue'], set_={'seq': offset.excluded.seq}),
+            {'queue': 'mood_log', 'seq': next_seq})
+        db.session.commit()
+
+mood_queue = MoodQueue(app.config['MOOD_QUEUE_DIR'], consume_moods,
+                       batch_size=app.config['MOOD_QUEUE_BATCH_ROWS'],
+                       max_pending=app.config['MOOD_QUEUE_MAX_PENDING'])
 
 # User Registration
 @app.route('/register', methods=['POST'])
 def register():
     data = request.json
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    hashed_password = hasher.hash(data['password'])
     new_user = User(username=data['username'], password=hashed_password)
     db.session.add(new_user)
     db.session.commit()
@@ -35,22 +188,257 @@ def register():
 def login():
     data = request.json
     user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password, data['password']):
+    if user and hasher.verify(user.password, data['password']):
         return jsonify({"message": "Login successful!"})
     return jsonify({"message": "Invalid credentials!"}), 401
 
 # Mood Logging
 @app.route('/log_mood', methods=['POST'])
 def log_mood():
-    data = request.json
-    user = User.query.filter_by(username=data['username']).first()
-    if user:
-        new_mood = MoodLog(user_id=user.id, mood=data['mood'])
-        db.session.add(new_mood)
-        db.session.commit()
-        return jsonify({"message": "Mood logged successfully!"})
-    return jsonify({"message": "User not found!"}), 404
+    data = request.get_json(silent=True)
+    # Checked before the row is queued or batched, where a bad row would
+    # hold up or fail the rows around it
+    if not (isinstance(data, dict) and isinstance(data.get('username'), str)
+            and isinstance(data.get('mood'), str) and data['mood']):
+        return jsonify({"message": "Expected username and a non-empty mood"}), 400
+    user_id = user_ids.get(data['username'])
+    if user_id is None:
+        return jsonify({"message": "User not found!"}), 404
+    row = {
+        'user_id': user_id,
+        'mood': data['mood'],
+        'timestamp': datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+    if app.config['MOOD_INGEST_MODE'] == 'queue':
+        # Durable in the local log; written to the database in the background
+        try:
+            mood_queue.append(dict(row, timestamp=row['timestamp'].isoformat()))
+        except QueueFull:
+            response = jsonify({"message": "Too many pending mood logs, try again later"})
+            response.headers['Retry-After'] = str(app.config['MOOD_QUEUE_RETRY_AFTER'])
+            return response, 503
+        return jsonify({"message": "Mood accepted for logging!"}), 202
+    # Returns once the batch holding this row has been committed
+    mood_writer.write(row)
+    return jsonify({"message": "Mood logged successfully!"})
+
+# Queue depth, lag and throughput counters for queue ingest mode
+@app.route('/mood_queue/stats', methods=['GET'])
+def mood_queue_stats():
+    return jsonify(dict(mood_queue.stats(), mode=app.config['MOOD_INGEST_MODE']))
+
+# Read a bulk request body: a JSON array, or NDJSON (one object per line)
+# streamed from the request. Yields (index, entry, error) per row.
+def iter_bulk_entries():
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for index, line in enumerate(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line), None
+            except ValueError:
+                yield index, None, "Invalid JSON"
+        return
+    entries = request.get_json(silent=True)
+    if not isinstance(entries, list):
+        yield 0, None, "Expected a JSON array or NDJSON body"
+        return
+    for index, entry in enumerate(entries):
+        yield index, entry, None
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def parse_timestamp(value):
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    timestamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def bulk_response(results):
+    inserted = sum(1 for result in results if result['status'] == 'ok')
+    return jsonify({"inserted": inserted, "failed": len(results) - inserted,
+                    "results": results})
+
+# Bulk Mood Logging: [{"username", "mood", "timestamp"?}, ...]
+@app.route('/bulk/log_mood', methods=['POST'])
+def bulk_log_mood():
+    results = []
+    for chunk in iter_chunks(iter_bulk_entries(), app.config['BULK_CHUNK_SIZE']):
+        checked = []
+        for index, entry, error in chunk:
+            if error is None and not (isinstance(entry, dict)
+                                      and isinstance(entry.get('username'), str)
+                                      and isinstance(entry.get('mood'), str)
+                                      and entry['mood']):
+                error = "Expected username, mood and an optional ISO timestamp"
+            checked.append((index, entry, error))
+        names = {entry['username'] for _, entry, error in checked if error is None}
+        known = dict(db.session.query(User.username, User.id)
+                     .filter(User.username.in_(names)).all()) if names else {}
+        rows, row_results = [], []
+        for index, entry, error in checked:
+            if error is None:
+                try:
+                    if entry['username'] not in known:
+                        error = "User not found!"
+                    else:
+                        rows.append({'user_id': known[entry['username']],
+                                     'mood': entry['mood'],
+                                     'timestamp': parse_timestamp(entry.get('timestamp'))})
+                except (TypeError, ValueError):
+                    error = "Expected username, mood and an optional ISO timestamp"
+            if error is None:
+                row_results.append({"index": index, "status": "ok"})
+            else:
+                results.append({"index": index, "status": "error", "message": error})
+        # One transaction per chunk
+        try:
+            if rows:
+                insert_moods(rows)
+        except Exception as exc:
+            row_results = [{"index": r["index"], "status": "error", "message": str(exc)}
+                           for r in row_results]
+        results.extend(row_results)
+    results.sort(key=lambda result: result['index'])
+    return bulk_response(results)
+
+# Bulk User Registration: [{"username", "password"}, ...]
+@app.route('/bulk/register', methods=['POST'])
+def bulk_register():
+    results = []
+    seen = set()
+    for chunk in iter_chunks(iter_bulk_entries(), app.config['BULK_CHUNK_SIZE']):
+        valid = []
+        for index, entry, error in chunk:
+            if error is None and not (isinstance(entry, dict)
+                                      and isinstance(entry.get('username'), str)
+                                      and isinstance(entry.get('password'), str)
+                                      and entry['username'] and entry['password']):
+                error = "Expected username and password"
+            elif error is None and entry['username'] in seen:
+                error = "Duplicate username in request"
+            if error is None:
+                seen.add(entry['username'])
+                valid.append((index, entry))
+            else:
+                results.append({"index": index, "status": "error", "message": error})
+        names = [entry['username'] for _, entry in valid]
+        taken = {name for (name,) in db.session.query(User.username)
+                 .filter(User.username.in_(names)).all()} if names else set()
+        for index, entry in valid:
+            if entry['username'] in taken:
+                results.append({"index": index, "status": "error",
+                                "message": "Username already exists"})
+        valid = [(index, entry) for index, entry in valid if entry['username'] not in taken]
+        hashes = hasher.hash_many(entry['password'] for _, entry in valid)
+        rows = [{'username': entry['username'], 'password': hashed}
+                for (_, entry), hashed in zip(valid, hashes)]
+        try:
+            if rows:
+                db.session.execute(User.__table__.insert(), rows)
+                db.session.commit()
+            status = {"status": "ok"}
+        except Exception as exc:
+            db.session.rollback()
+            status = {"status": "error", "message": str(exc)}
+        results.extend(dict(status, index=index) for index, _ in valid)
+    results.sort(key=lambda result: result['index'])
+    return bulk_response(results)
+
+def parse_date(value, default=None):
+    return date.fromisoformat(value) if value else default
+
+def encode_cursor(entry):
+    return f"{entry.timestamp.isoformat()}_{entry.id}"
+
+def decode_cursor(cursor):
+    timestamp, entry_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(entry_id)
+
+# Mood History: newest first, keyset pagination on (timestamp, id)
+@app.route('/mood_history/<username>', methods=['GET'])
+def mood_history(username):
+    user_id = user_ids.get(username)
+    if user_id is None:
+        return jsonify({"message": "User not found!"}), 404
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+        cursor = request.args.get('cursor')
+        query = MoodLog.query.filter(MoodLog.user_id == user_id)
+        if cursor:
+            query = query.filter(tuple_(MoodLog.timestamp, MoodLog.id) < decode_cursor(cursor))
+    except ValueError:
+        return jsonify({"message": "Invalid limit or cursor!"}), 400
+    entries = query.order_by(MoodLog.timestamp.desc(), MoodLog.id.desc()).limit(limit + 1).all()
+    page = entries[:limit]
+    return jsonify({
+        "entries": [{"id": e.id, "mood": e.mood, "timestamp": e.timestamp.isoformat()}
+                    for e in page],
+        "next_cursor": encode_cursor(page[-1]) if len(entries) > limit else None,
+    })
+
+def rollup_query(user_id, start, end):
+    query = MoodDailyRollup.query
+    if user_id is not None:
+        query = query.filter(MoodDailyRollup.user_id == user_id)
+    if start:
+        query = query.filter(MoodDailyRollup.day >= start)
+    if end:
+        query = query.filter(MoodDailyRollup.day <= end)
+    return query
+
+# Daily or weekly (weeks start on Monday) mood counts for one user
+@app.route('/mood_stats/<username>', methods=['GET'])
+def mood_stats(username):
+    user_id = user_ids.get(username)
+    if user_id is None:
+        return jsonify({"message": "User not found!"}), 404
+    period = request.args.get('period', 'daily')
+    if period not in ('daily', 'weekly'):
+        return jsonify({"message": "period must be daily or weekly"}), 400
+    try:
+        start, end = parse_date(request.args.get('start')), parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({"message": "Dates must be YYYY-MM-DD"}), 400
+    buckets = defaultdict(Counter)
+    for row in rollup_query(user_id, start, end).order_by(MoodDailyRollup.day):
+        day = row.day if period == 'daily' else row.day - timedelta(days=row.day.weekday())
+        buckets[day][row.mood] += row.total
+    return jsonify({"period": period,
+                    "counts": [{"start": day.isoformat(), "moods": dict(moods)}
+                               for day, moods in buckets.items()]})
+
+# Mood distribution over a date range, for one user or everyone
+@app.route('/mood_distribution', methods=['GET'])
+def mood_distribution():
+    user_id = None
+    if request.args.get('username'):
+        user_id = user_ids.get(request.args['username'])
+        if user_id is None:
+            return jsonify({"message": "User not found!"}), 404
+    try:
+        start, end = parse_date(request.args.get('start')), parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({"message": "Dates must be YYYY-MM-DD"}), 400
+    totals = (rollup_query(user_id, start, end)
+              .with_entities(MoodDailyRollup.mood, func.sum(MoodDailyRollup.total))
+              .group_by(MoodDailyRollup.mood).all())
+    count = sum(total for _, total in totals)
+    return jsonify({"total": count,
+                    "moods": {mood: {"count": total, "share": round(total / count, 4)}
+                              for mood, total in totals}})
 
 if __name__ == '__main__':
-    db.create_all()
+    with app.app_context():
+        init_db()
+    # Replay whatever a previous run left in the log, in the reloader's
+    # serving process (the watcher process must not hold the queue lock)
+    if app.config['MOOD_INGEST_MODE'] == 'queue' and os.environ.get('WERKZEUG_RUN_MAIN'):
+        mood_queue.start()
     app.run(debug=True)
@@ -1,18 +1,19 @@
+import functools
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.constants import Boltzmann as k
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-# LED properties dictionary
-led_properties = {
-    'Red': {'V_f': 1.8, 'I_f': 20e-3},
-    'Green': {'V_f': 2.2, 'I_f': 20e-3},
-    'Blue': {'V_f': 3.0, 'I_f': 20e-3},
-    'Yellow': {'V_f': 2.1, 'I_f': 20e-3},
-    'White': {'V_f': 3.2, 'I_f': 20e-3}
+from led_model import LED_PROPERTIES as led_properties
+from led_model import ROOM_TEMPERATURE, characteristics, diode_current, solve_voltage
+
+# Graph themes, applied to the one persistent figure
+THEMES = {
+    'light': {'face': 'white', 'text': 'black', 'grid': '#b0b0b0'},
+    'dark': {'face': 'black', 'text': 'white', 'grid': '#444444'},
 }
 
 # Custom dialog box for feedback
@@ -27,165 +28,267 @@ def custom_message_dialog(title, message):
     dialog.grab_set()
     dialog.wait_window()
 
-# Diode equation to calculate current
-def diode_current(V, V_f, I_f, T=300):
-    q = 1.6e-19
-    V_T = k * T / q
-    try:
-        I = I_f * (np.exp(V / V_T) - 1)
-        return I
-    except OverflowError:
-        return np.inf
-
-# Inverse: Calculate voltage for given current
-def diode_voltage(I_target, V_f, T=300):
-    q = 1.6e-19
-    V_T = k * T / q
-    try:
-        V = V_T * np.log((I_target / 20e-3) + 1)
-        return V
-    except:
-        return None
-
-# Modify characteristics based on conditions
-def apply_modifications(V_f, I_f, temp, duration):
-    delta_temp = (temp - 25) * 0.002
-    delta_duration = (duration - 0) * 0.0005
-    new_V_f = V_f - delta_temp - delta_duration
-    new_I_f = I_f + delta_temp * 10 - delta_duration * 10
-    return max(new_V_f, 0), max(new_I_f, 1e-6)
-
-# Plotting VI curve
-def plot_vi(color, mode, modified, temp, duration, show_comparison, graph_type, voltage_inputs):
-    V_f = led_properties[color]['V_f']
-    I_f = led_properties[color]['I_f']
-    T = temp + 273.15 if modified else 298
-
-    if modified:
-        V_f, I_f = apply_modifications(V_f, I_f, temp, duration)
-
-    # Set theme
-    plt.style.use('dark_background' if mode == 'dark' else 'default')
-
-    fig, ax = plt.subplots(figsize=(7, 5))
-    for v_in in voltage_inputs:
-        voltages = np.linspace(0, max(v_in + 1, 5), 100)
-        currents = diode_current(voltages, V_f, I_f, T)
-
-        label = f"{color} LED @ {v_in}V"
-        if graph_type == 'line':
-            ax.plot(voltages, currents * 1e3, label=label)
-        elif graph_type == 'scatter':
-            ax.scatter(voltages, currents * 1e3, label=label, s=10)
-        elif graph_type == 'bar':
-            ax.bar(voltages, currents * 1e3, width=0.05, label=label)
-
-    if show_comparison:
+# Comparison curve for an unmodified LED at room temperature, cached per colour
+@functools.lru_cache(maxsize=len(led_properties))
+def comparison_curve(color):
+    voltages = np.linspace(0, 5, 100)
+    currents = diode_current(voltages, led_properties[color]['V_f'], led_properties[color]['I_f'],
+                             ROOM_TEMPERATURE)
+    return voltages, currents * 1e3
+
+# Compute every curve for the current settings. Runs on a worker thread, so
+# it must not touch Tk. Each curve carries a key of its inputs so the plot
+# only updates artists whose inputs changed.
+def compute_curves(params):
+    color = params['color']
+    modified = params['modified']
+    temp, duration = params['temp'], params['duration']
+    result = {'voltage': None, 'curves': []}
+
+    voltage_inputs = params['voltages']
+    if params['input_mode'] == 'Current to Voltage':
+        solution = solve_voltage(params['current'], color, temp, duration, modified)
+        if not solution.converged:
+            raise ValueError("Could not calculate voltage.")
+        result['voltage'] = float(solution.voltage)
+        voltage_inputs = [result['voltage']]
+
+    # All input curves in one broadcast call: one row per input voltage
+    V_f, I_f, T = characteristics(color, temp, duration, modified)
+    voltage_inputs = np.asarray(voltage_inputs, dtype=float)
+    all_voltages = np.linspace(0, np.maximum(voltage_inputs + 1, 5), 100, axis=1)
+    all_currents = diode_current(all_voltages, V_f, I_f, T) * 1e3
+    condition = (color, modified, temp, duration) if modified else (color, modified)
+    for v_in, voltages, currents in zip(voltage_inputs, all_voltages, all_currents):
+        label = f"{color} LED @ {v_in:g}V"
+        result['curves'].append((label, condition + (v_in,), voltages, currents, '-'))
+
+    if params['comparison']:
         for other in led_properties:
             if other != color:
-                ov, oi = led_properties[other]['V_f'], led_properties[other]['I_f']
-                voltages = np.linspace(0, 5, 100)
-                currents = diode_current(voltages, ov, oi, 298)
-                ax.plot(voltages, currents * 1e3, '--', label=f'{other} LED')
-
-    ax.set_title(f'VI Characteristics of {color} LED')
-    ax.set_xlabel('Voltage (V)')
-    ax.set_ylabel('Current (mA)')
-    ax.legend()
-    ax.grid(True)
-    plt.tight_layout()
-    plt.show()
+                voltages, currents = comparison_curve(other)
+                result['curves'].append((f'{other} LED', (other,), voltages, currents, '--'))
+    return result
+
+# One embedded figure whose artists are updated in place
+class IVPlot:
+    def __init__(self, master):
+        self.figure = Figure(figsize=(7, 5))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.ax.set_xlabel('Voltage (V)')
+        self.ax.set_ylabel('Current (mA)')
+        self.artists = {}  # label -> (graph type, input key, artist)
+        self.theme = None
+
+    def set_theme(self, mode):
+        if mode == self.theme:
+            return
+        colors = THEMES.get(mode, THEMES['light'])
+        self.figure.set_facecolor(colors['face'])
+        self.ax.set_facecolor(colors['face'])
+        for item in [self.ax.title, self.ax.xaxis.label, self.ax.yaxis.label]:
+            item.set_color(colors['text'])
+        self.ax.tick_params(colors=colors['text'])
+        for spine in self.ax.spines.values():
+            spine.set_color(colors['text'])
+        self.ax.grid(True, color=colors['grid'])
+        self.theme = mode
+
+    def _draw_artist(self, graph_type, voltages, currents, style, label):
+        if style == '--' or graph_type == 'line':
+            return self.ax.plot(voltages, currents, style, label=label)[0]
+        if graph_type == 'scatter':
+            return self.ax.scatter(voltages, currents, label=label, s=10)
+        return self.ax.bar(voltages, currents, width=0.05, label=label)
+
+    def _update_artist(self, artist, graph_type, voltages, currents, style):
+        if style == '--' or graph_type == 'line':
+            artist.set_data(voltages, currents)
+        elif graph_type == 'scatter':
+            artist.set_offsets(np.column_stack([voltages, currents]))
+        elif len(artist.patches) == len(voltages):
+            for patch, x, height in zip(artist.patches, voltages, currents):
+                patch.set_x(x - 0.025)
+                patch.set_height(height)
+        else:
+            return False
+        return True
+
+    def render(self, title, curves, graph_type, mode):
+        self.set_theme(mode)
+        wanted = {label for label, *_ in curves}
+        for label in list(self.artists):
+            if label not in wanted:
+                self.artists.pop(label)[2].remove()
+
+        for label, key, voltages, currents, style in curves:
+            kind = 'line' if style == '--' else graph_type
+            existing = self.artists.get(label)
+            if existing and existing[0] == kind:
+                if existing[1] == key:
+                    continue
+                if self._update_artist(existing[2], kind, voltages, currents, style):
+                    self.artists[label] = (kind, key, existing[2])
+                    continue
+            if existing:
+                existing[2].remove()
+            artist = self._draw_artist(kind, voltages, currents, style, label)
+            self.artists[label] = (kind, key, artist)
+
+        self.ax.set_title(title)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        if self.artists:
+            legend = self.ax.legend()
+            for text in legend.get_texts():
+                text.set_color(THEMES.get(mode, THEMES['light'])['text'])
+            legend.get_frame().set_facecolor(THEMES.get(mode, THEMES['light'])['face'])
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
 
 # GUI
 def create_ui():
-    def update_graph():
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending = {'future': None, 'generation': 0, 'params': None, 'interactive': False}
+
+    def read_params():
+        input_mode = input_mode_var.get()
+        params = {
+            'color': color_var.get(),
+            'mode': mode_var.get(),
+            'modified': modified_var.get() == 'Yes',
+            'temp': float(temp_var.get()),
+            'duration': float(duration_var.get()),
+            'comparison': comparison_var.get() == 'Yes',
+            'graph_type': graph_type_var.get(),
+            'input_mode': input_mode,
+            'voltages': [],
+            'current': None,
+        }
+        if params['color'] not in led_properties:
+            raise ValueError("Please select a valid LED color.")
+        if input_mode == 'Voltage to Current':
+            voltages = voltage_input_var.get().split(',')
+            params['voltages'] = [float(v.strip()) for v in voltages if v.strip()]
+            if not params['voltages']:
+                raise ValueError("Please enter valid voltage values.")
+        else:
+            params['current'] = float(current_input_var.get())
+            if params['current'] <= 0:
+                raise ValueError("Enter a valid current value.")
+        return params
+
+    # Read the settings on the UI thread and compute on the worker thread.
+    # Only the newest request is drawn; older results are dropped.
+    def update_graph(interactive=True):
         try:
-            selected_color = color_var.get()
-            graph_mode = mode_var.get()
-            use_modified = modified_var.get()
-            temp = temp_var.get()
-            duration = duration_var.get()
-            comparison = comparison_var.get()
-            graph_type = graph_type_var.get()
-            input_mode = input_mode_var.get()
-            voltage_input = voltage_input_var.get()
-
-            if input_mode == 'Voltage to Current':
-                voltages = voltage_input.split(',')
-                voltages = [float(v.strip()) for v in voltages if v.strip()]
-                if not voltages:
-                    custom_message_dialog("Input Error", "Please enter valid voltage values.")
-                    return
-                plot_vi(selected_color, graph_mode, use_modified == 'Yes', temp, duration, comparison == 'Yes', graph_type, voltages)
-
-            else:
-                current_value = current_input_var.get()
-                if current_value <= 0:
-                    custom_message_dialog("Input Error", "Enter a valid current value.")
-                    return
-                voltage = diode_voltage(current_value, led_properties[selected_color]['V_f'], temp + 273.15)
-                if voltage is None:
-                    custom_message_dialog("Error", "Could not calculate voltage.")
-                    return
-                result_label.config(text=f"Required Voltage ≈ {voltage:.2f} V")
-                plot_vi(selected_color, graph_mode, use_modified == 'Yes', temp, duration, comparison == 'Yes', graph_type, [voltage])
-
+            params = read_params()
+        except (ValueError, tk.TclError) as e:
+            if interactive:
+                custom_message_dialog("Input Error", str(e) if isinstance(e, ValueError)
+                                      else "Please enter valid numbers.")
+            return
+        pending['generation'] += 1
+        pending['params'] = params
+        pending['interactive'] = interactive
+        pending['future'] = executor.submit(compute_curves, params)
+        root.after(10, poll, pending['generation'])
+
+    def poll(generation):
+        future = pending['future']
+        if generation != pending['generation']:
+            return
+        if not future.done():
+            root.after(10, poll, generation)
+            return
+        params = pending['params']
+        try:
+            result = future.result()
         except Exception as e:
-            custom_message_dialog("Error", str(e))
+            if pending['interactive']:
+                custom_message_dialog("Error", str(e))
+            return
+        if result['voltage'] is not None:
+            result_label.config(text=f"Required Voltage ≈ {result['voltage']:.2f} V")
+        plot.render(f"VI Characteristics of {params['color']} LED", result['curves'],
+                    params['graph_type'], params['mode'])
+
+    # Redraw as soon as a setting changes, without error dialogs
+    def on_change(*_):
+        update_graph(interactive=False)
+
+    def on_close():
+        executor.shutdown(wait=False, cancel_futures=True)
+        root.destroy()
 
     root = tk.Tk()
     root.title('VI Characteristics of LEDs')
-    root.geometry('450x750')
+    root.geometry('1150x750')
     root.configure(bg='#f0f0f0')
+    root.protocol('WM_DELETE_WINDOW', on_close)
+
+    controls = tk.Frame(root, bg='#f0f0f0')
+    controls.pack(side=tk.LEFT, fill=tk.Y, padx=10)
+    graph_frame = tk.Frame(root)
+    graph_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+    plot = IVPlot(graph_frame)
 
     # Components
     def create_label(text):
-        return tk.Label(root, text=text, bg='#f0f0f0', font=('Segoe UI', 10))
+        return tk.Label(controls, text=text, bg='#f0f0f0', font=('Segoe UI', 10))
 
     color_var = tk.StringVar(value='Red')
     create_label('Select LED Color:').pack(pady=5)
-    ttk.Combobox(root, textvariable=color_var, values=list(led_properties.keys())).pack()
+    ttk.Combobox(controls, textvariable=color_var, values=list(led_properties.keys())).pack()
 
     mode_var = tk.StringVar(value='light')
     create_label('Graph Theme:').pack(pady=5)
-    ttk.Combobox(root, textvariable=mode_var, values=['light', 'dark']).pack()
+    ttk.Combobox(controls, textvariable=mode_var, values=['light', 'dark']).pack()
 
     modified_var = tk.StringVar(value='No')
     create_label('Is LED Modified?').pack(pady=5)
-    ttk.Combobox(root, textvariable=modified_var, values=['Yes', 'No']).pack()
+    ttk.Combobox(controls, textvariable=modified_var, values=['Yes', 'No']).pack()
 
     temp_var = tk.DoubleVar(value=25)
     create_label('Temperature (°C):').pack(pady=5)
-    tk.Entry(root, textvariable=temp_var).pack()
+    tk.Scale(controls, variable=temp_var, from_=-40, to=125, resolution=0.5,
+             orient=tk.HORIZONTAL, length=200, bg='#f0f0f0').pack()
 
     duration_var = tk.DoubleVar(value=0)
     create_label('Duration (s):').pack(pady=5)
-    tk.Entry(root, textvariable=duration_var).pack()
+    tk.Scale(controls, variable=duration_var, from_=0, to=3600, resolution=10,
+             orient=tk.HORIZONTAL, length=200, bg='#f0f0f0').pack()
 
     comparison_var = tk.StringVar(value='No')
     create_label('Show Comparison?').pack(pady=5)
-    ttk.Combobox(root, textvariable=comparison_var, values=['Yes', 'No']).pack()
+    ttk.Combobox(controls, textvariable=comparison_var, values=['Yes', 'No']).pack()
 
     graph_type_var = tk.StringVar(value='line')
     create_label('Graph Type:').pack(pady=5)
-    ttk.Combobox(root, textvariable=graph_type_var, values=['line', 'scatter', 'bar']).pack()
+    ttk.Combobox(controls, textvariable=graph_type_var, values=['line', 'scatter', 'bar']).pack()
 
     input_mode_var = tk.StringVar(value='Voltage to Current')
     create_label('Input Mode:').pack(pady=5)
-    ttk.Combobox(root, textvariable=input_mode_var, values=['Voltage to Current', 'Current to Voltage']).pack()
+    ttk.Combobox(controls, textvariable=input_mode_var, values=['Voltage to Current', 'Current to Voltage']).pack()
 
     voltage_input_var = tk.StringVar()
     create_label('Input Voltage(s) (comma-separated):').pack(pady=5)
-    tk.Entry(root, textvariable=voltage_input_var).pack()
+    tk.Entry(controls, textvariable=voltage_input_var).pack()
 
     current_input_var = tk.DoubleVar(value=0)
     create_label('Input Current (A):').pack(pady=5)
-    tk.Entry(root, textvariable=current_input_var).pack()
+    tk.Entry(controls, textvariable=current_input_var).pack()
 
     result_label = create_label('Result will be shown here.')
     result_label.pack(pady=10)
 
-    tk.Button(root, text='Generate Graph', command=update_graph, bg='#222', fg='white').pack(pady=20)
+    tk.Button(controls, text='Generate Graph', command=update_graph, bg='#222', fg='white').pack(pady=20)
+
+    for var in (color_var, mode_var, modified_var, temp_var, duration_var, comparison_var,
+                graph_type_var, input_mode_var, voltage_input_var, current_input_var):
+        var.trace_add('write', on_change)
 
     root.mainloop()
 
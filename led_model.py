@@ -0,0 +1,155 @@
+from collections import namedtuple
+
+import numpy as np
+
+# -------------------------------
+# LED I-V Model
+# -------------------------------
+# Pure NumPy version of the diode model behind "led (2).py", with no Tk or
+# matplotlib dependency. Every function broadcasts over its arguments, so a
+# whole table of (colour, temperature, duration, voltage) operating points
+# is evaluated in one call.
+#
+# Each LED is an ideal (Shockley) diode, I = I_s (exp(V / (n V_T)) - 1),
+# whose saturation current I_s is calibrated from its rated operating point
+# so that it carries I_f at V = V_f.
+
+BOLTZMANN = 1.380649e-23  # J/K, same value as scipy.constants.Boltzmann
+Q = 1.6e-19  # electron charge as used by the original model
+ROOM_TEMPERATURE = 298  # K, used for unmodified LEDs
+V_F_MIN = 0.1  # V, lowest derated forward voltage, keeps I_s finite
+
+# LED properties dictionary
+LED_PROPERTIES = {
+    'Red': {'V_f': 1.8, 'I_f': 20e-3},
+    'Green': {'V_f': 2.2, 'I_f': 20e-3},
+    'Blue': {'V_f': 3.0, 'I_f': 20e-3},
+    'Yellow': {'V_f': 2.1, 'I_f': 20e-3},
+    'White': {'V_f': 3.2, 'I_f': 20e-3}
+}
+COLORS = list(LED_PROPERTIES)
+_V_F = np.array([LED_PROPERTIES[c]['V_f'] for c in COLORS])
+_I_F = np.array([LED_PROPERTIES[c]['I_f'] for c in COLORS])
+
+# Largest exponent whose exp() is still a finite float64
+EXP_MAX = np.log(np.finfo(np.float64).max)
+
+# Result of solve_voltage, one element per target current
+VoltageSolution = namedtuple('VoltageSolution', ['voltage', 'converged', 'iterations'])
+
+# Result of evaluate_iv: colour is an index into COLORS
+IV_DTYPE = np.dtype([
+    ('color', np.uint8),
+    ('temperature', np.float32),
+    ('duration', np.float32),
+    ('voltage', np.float32),
+    ('current', np.float64),
+])
+
+
+def thermal_voltage(T):
+    return BOLTZMANN * np.asarray(T, dtype=float) / Q
+
+
+# Saturation current that makes the diode carry I_f at V_f
+def saturation_current(V_f, I_f, T=300, n=1.0):
+    return I_f / np.expm1(np.asarray(V_f, dtype=float) / (n * thermal_voltage(T)))
+
+
+# Diode equation to calculate current. The exponent is clipped instead of
+# overflowing, so very large voltages give a huge but finite current.
+def diode_current(V, V_f, I_f, T=300, n=1.0):
+    exponent = np.asarray(V, dtype=float) / (n * thermal_voltage(T))
+    return saturation_current(V_f, I_f, T, n) * np.expm1(np.minimum(exponent, EXP_MAX - 1))
+
+
+# Modify characteristics based on conditions
+def apply_modifications(V_f, I_f, temp, duration):
+    delta_temp = (np.asarray(temp, dtype=float) - 25) * 0.002
+    delta_duration = (np.asarray(duration, dtype=float) - 0) * 0.0005
+    new_V_f = V_f - delta_temp - delta_duration
+    new_I_f = I_f + delta_temp * 10 - delta_duration * 10
+    return np.maximum(new_V_f, V_F_MIN), np.maximum(new_I_f, 1e-6)
+
+
+# Map colour names (or indices) to indices into COLORS
+def color_index(colors):
+    colors = np.asarray(colors)
+    if colors.dtype.kind in 'iu':
+        return colors
+    names, inverse = np.unique(colors, return_inverse=True)
+    unknown = set(names) - set(COLORS)
+    if unknown:
+        raise ValueError(f"Unknown LED colour(s): {', '.join(sorted(unknown))}")
+    lookup = np.array([COLORS.index(name) for name in names])
+    return lookup[inverse].reshape(colors.shape)
+
+
+# LED characteristics for arrays of colour, temperature (°C) and duration (s).
+# Returns (V_f, I_f, T) the same way plot_vi does: modified LEDs are derated
+# and run at their own temperature, unmodified ones at room temperature.
+def characteristics(colors, temps=25, durations=0, modified=True):
+    index = color_index(colors)
+    V_f, I_f = _V_F[index], _I_F[index]
+    if modified:
+        V_f, I_f = apply_modifications(V_f, I_f, temps, durations)
+        T = np.asarray(temps, dtype=float) + 273.15
+    else:
+        T = np.full(np.shape(index), ROOM_TEMPERATURE, dtype=float)
+    return V_f, I_f, T
+
+
+# Evaluate I-V points for every broadcast combination of the inputs, e.g.
+# colors[:, None, None, None], temps[None, :, None, None], ... for a full grid.
+def evaluate_iv(colors, temps=25, durations=0, voltages=0, modified=True):
+    index, temps, durations, voltages = np.broadcast_arrays(
+        color_index(colors), np.asarray(temps, dtype=float),
+        np.asarray(durations, dtype=float), np.asarray(voltages, dtype=float))
+    V_f, I_f, T = characteristics(index, temps, durations, modified)
+    result = np.empty(index.shape, dtype=IV_DTYPE)
+    result['color'] = index
+    result['temperature'] = temps
+    result['duration'] = durations
+    result['voltage'] = voltages
+    result['current'] = diode_current(voltages, V_f, I_f, T)
+    return result
+
+
+# Inverse of the full diode model
+#     I = I_s * (exp(V_d / (n V_T)) - 1) + V_d / R_sh,   V = V_d + I R_s
+# with I_s = saturation_current(V_f, I_f, T, n), for arrays of target
+# currents and any broadcast combination of colour, temperature and
+# duration. Without a shunt (R_sh = inf) V_d has a closed form. With a shunt the residual is convex and increasing in V_d, so Newton
+# started where the residual is >= 0 converges monotonically; every element
+# is iterated together until its step is below tolerance. Targets with no
+# solution (I <= -I_s and no shunt) come back as NaN with converged=False.
+def solve_voltage(I_target, colors, temps=25, durations=0, modified=True,
+                  R_s=0.0, n=1.0, R_sh=np.inf, tol=1e-12, max_iter=100):
+    V_f, I_f, T = characteristics(colors, temps, durations, modified)
+    I, I_s, a, R_s, R_sh = np.broadcast_arrays(
+        np.asarray(I_target, dtype=float), saturation_current(V_f, I_f, T, n),
+        n * thermal_voltage(T), np.asarray(R_s, dtype=float), np.asarray(R_sh, dtype=float))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        V_d = a * np.log1p(np.maximum(I, 0) / I_s)
+        no_shunt = np.isinf(R_sh)
+        V_d = np.where(no_shunt, a * np.log1p(I / I_s), V_d)
+    converged = no_shunt & np.isfinite(V_d)
+    iterations = np.zeros(I.shape, dtype=np.uint8)
+
+    active = ~no_shunt
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        x, i_s, scale, shunt = V_d[active], I_s[active], a[active], R_sh[active]
+        residual = i_s * np.expm1(x / scale) + x / shunt - I[active]
+        slope = i_s / scale * np.exp(x / scale) + 1 / shunt
+        step = residual / slope
+        V_d[active] = x - step
+        iterations[active] += 1
+        done = np.abs(step) <= tol * (1 + np.abs(x))
+        converged[np.flatnonzero(active)[done]] = True
+        active[np.flatnonzero(active)[done]] = False
+
+    voltage = np.where(converged, V_d + I * R_s, np.nan)
+    return VoltageSolution(voltage, converged, iterations)
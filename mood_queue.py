@@ -0,0 +1,364 @@
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------
+# Durable Mood Ingest Queue
+# -------------------------------
+# File-backed append-only log for /log_mood in queue mode, no broker needed.
+# A request appends its row and returns; background consumers drain the log
+# into MoodLog in batches, so the database's write speed and lock
+# contention stay out of request latency.
+#
+# On disk (one directory, one owning process, guarded by a lock file):
+#   <offset>.log  segments named by the global byte offset they start at.
+#                 Each record is a header (length, crc32, sequence number,
+#                 append time) followed by a JSON payload.
+#   committed     JSON {"offset", "seq"} of the first unconsumed record,
+#                 replaced atomically after every consumed batch.
+#   dead_letter.jsonl
+#                 records the consumer kept rejecting, one JSON line each
+#                 with seq, row and error, for inspection or a manual replay.
+# On start-up a torn record at the tail (crash mid-append) is truncated and
+# everything after the committed offset is replayed. Delivery is at least
+# once: a crash between the database commit and the offset commit replays
+# that one batch. The consumer is called as consume(rows, first_seq) so it
+# can record the sequence numbers with its own commit and skip a replay.
+# A batch that fails max_attempts times is retried record by record, and a
+# record that still fails is dead-lettered so it cannot stall the log.
+# Appends are refused with QueueFull once max_pending
+# records are waiting, which the API turns into a 503.
+
+HEADER = struct.Struct('<IIQd')  # payload length, crc32, seq, appended at
+SEGMENT_BYTES = 64 * 1024 * 1024
+COMMITTED_FILE = 'committed'
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+LOCK_FILE = 'lock'
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def _segment_name(offset):
+    return f'{offset:020d}.log'
+
+
+def _write_atomic(path, data):
+    staging = path + '.tmp'
+    with open(staging, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging, path)
+
+
+class MoodQueue:
+    def __init__(self, directory, consume, batch_size=500, max_pending=100000,
+                 consumers=1, sync='always', sync_interval_ms=5, segment_bytes=SEGMENT_BYTES,
+                 retry_delay_ms=500, max_attempts=5):
+        if sync not in ('always', 'interval'):
+            raise ValueError("sync must be 'always' or 'interval'")
+        self.directory = directory
+        self.consume = consume
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.consumers = consumers
+        self.sync = sync
+        self.sync_interval = sync_interval_ms / 1000
+        self.segment_bytes = segment_bytes
+        self.retry_delay = retry_delay_ms / 1000
+        self.max_attempts = max_attempts
+        self._cond = threading.Condition()
+        self._started = False
+        self._stopped = False
+        self._threads = []
+        self._counters = {'appended': 0, 'consumed': 0, 'batches': 0, 'failures': 0,
+                          'rejected': 0, 'replayed': 0, 'dead_lettered': 0}
+
+    # -------------------------------
+    # Start-up and Recovery
+    # -------------------------------
+
+    # Open the log, repair the tail and start the consumers. Called from the
+    # app's start-up so a backlog left by a crash is replayed right away;
+    # append() also calls it, so it is safe to call more than once.
+    def start(self):
+        with self._cond:
+            if self._started:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_file = open(os.path.join(self.directory, LOCK_FILE), 'w')
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise RuntimeError(f"Mood queue {self.directory} is used by another process")
+            self._committed_offset, self._committed_seq = self._read_committed()
+            self._recover()
+            self._counters['replayed'] = self._next_seq - self._committed_seq
+            self._read_offset, self._read_seq = self._committed_offset, self._committed_seq
+            self._executor = ThreadPoolExecutor(max_workers=self.consumers,
+                                                thread_name_prefix='mood-consumer')
+            self._spawn(self._read_loop, 'mood-queue-reader')
+            if self.sync == 'interval':
+                self._spawn(self._sync_loop, 'mood-queue-sync')
+            self._started = True
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _read_committed(self):
+        try:
+            with open(os.path.join(self.directory, COMMITTED_FILE)) as f:
+                committed = json.load(f)
+            return committed['offset'], committed['seq']
+        except FileNotFoundError:
+            segments = self._segments()
+            return (segments[0] if segments else 0), 0
+
+    def _segments(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory)
+                      if name.endswith('.log'))
+
+    # Find the end of the log past the committed offset, remembering the
+    # append times of the backlog and cutting off a torn last record
+    def _recover(self):
+        self._next_seq = self._committed_seq
+        self._pending_times = deque()  # append times of unconsumed records
+        end = self._committed_offset
+        for end, seq, appended_at, _ in self._iter_from(self._committed_offset, None):
+            self._next_seq = seq + 1
+            self._pending_times.append(appended_at)
+        base = (self._segments() or [self._committed_offset])[-1]
+        path = os.path.join(self.directory, _segment_name(base))
+        with open(path, 'ab') as f:
+            if f.tell() > max(end - base, 0):
+                f.truncate(max(end - base, 0))
+                os.fsync(f.fileno())
+        self._segment_base = base
+        self._log = open(path, 'ab')
+
+    # Yield (end position, seq, appended at, payload) for every valid record
+    # from the current file position, stopping at the first bad one
+    @staticmethod
+    def _iter_records(f):
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc, seq, appended_at = HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(header[8:] + payload) != crc:
+                return
+            yield f.tell(), seq, appended_at, payload
+
+    # Records from a global offset, at most `limit`: (next offset, seq,
+    # appended at, payload)
+    def _iter_from(self, offset, limit):
+        count = 0
+        for base in self._segments():
+            path = os.path.join(self.directory, _segment_name(base))
+            size = os.path.getsize(path)
+            if base + size <= offset:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(max(offset - base, 0))
+                for position, seq, appended_at, payload in self._iter_records(f):
+                    yield base + position, seq, appended_at, payload
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+
+    # -------------------------------
+    # Producers
+    # -------------------------------
+
+    # Append one row durably and return its sequence number
+    def append(self, row):
+        self.start()
+        payload = json.dumps(row, separators=(',', ':'), default=str).encode()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Mood queue has been stopped")
+            if self._next_seq - self._committed_seq >= self.max_pending:
+                self._counters['rejected'] += 1
+                raise QueueFull(f"{self.max_pending} mood logs are already waiting")
+            seq = self._next_seq
+            appended_at = time.time()
+            body = struct.pack('<Qd', seq, appended_at) + payload
+            self._log.write(struct.pack('<II', len(payload), zlib.crc32(body)) + body)
+            self._log.flush()
+            if self.sync == 'always':
+                os.fsync(self._log.fileno())
+            self._next_seq += 1
+            self._pending_times.append(appended_at)
+            self._counters['appended'] += 1
+            if self._log.tell() >= self.segment_bytes:
+                self._roll_segment()
+            self._cond.notify_all()
+        return seq
+
+    def _roll_segment(self):
+        os.fsync(self._log.fileno())
+        self._segment_base += self._log.tell()
+        self._log.close()
+        self._log = open(os.path.join(self.directory, _segment_name(self._segment_base)), 'ab')
+
+    def _sync_loop(self):
+        while not self._stopped:
+            time.sleep(self.sync_interval)
+            with self._cond:
+                if not self._log.closed:
+                    os.fsync(self._log.fileno())
+
+    # -------------------------------
+    # Consumers
+    # -------------------------------
+
+    # Read batches in log order and hand them to the consumer pool. Offsets
+    # are committed strictly in order, so a batch that finishes early waits
+    # for the ones before it.
+    def _read_loop(self):
+        in_flight = deque()
+        while True:
+            with self._cond:
+                while (self._read_seq >= self._next_seq and not self._stopped
+                       and not in_flight):
+                    self._cond.wait()
+                if self._stopped and self._read_seq >= self._next_seq and not in_flight:
+                    return
+            if self._read_seq < self._next_seq and len(in_flight) < self.consumers:
+                records = list(self._iter_from(self._read_offset, self.batch_size))
+                if records:
+                    rows = [json.loads(payload) for _, _, _, payload in records]
+                    end_offset, last_seq = records[-1][0], records[-1][1]
+                    future = self._executor.submit(self._consume, rows, records[0][1])
+                    in_flight.append((future, end_offset, last_seq + 1, len(rows)))
+                    self._read_offset, self._read_seq = end_offset, last_seq + 1
+                    continue
+            if in_flight:
+                future, end_offset, next_seq, count = in_flight.popleft()
+                future.result()
+                self._commit(end_offset, next_seq, count)
+
+    # Consume one batch; the rows stay in the log until it returns. When the
+    # batch keeps failing, find the bad records by retrying them one at a
+    # time and dead-letter those, so the records around them still go in.
+    def _consume(self, rows, first_seq):
+        try:
+            self._attempt(rows, first_seq)
+            return
+        except Exception as exc:
+            if self._stopped:
+                raise
+            if len(rows) == 1:
+                self._dead_letter(first_seq, rows[0], exc)
+                return
+        for seq, row in enumerate(rows, first_seq):
+            try:
+                self._attempt([row], seq)
+            except Exception as exc:
+                if self._stopped:
+                    raise
+                self._dead_letter(seq, row, exc)
+
+    # Call the consumer up to max_attempts times, raising the last error
+    def _attempt(self, rows, first_seq):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.consume(rows, first_seq)
+                return
+            except Exception:
+                with self._cond:
+                    self._counters['failures'] += 1
+                    if self._stopped or attempt == self.max_attempts:
+                        raise
+                time.sleep(self.retry_delay)
+
+    def _dead_letter(self, seq, row, exc):
+        record = json.dumps({'seq': seq, 'row': row, 'error': repr(exc), 'time': time.time()},
+                            default=str)
+        with self._cond:
+            with open(os.path.join(self.directory, DEAD_LETTER_FILE), 'a') as f:
+                f.write(record + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._counters['dead_lettered'] += 1
+
+    def _commit(self, offset, seq, count):
+        _write_atomic(os.path.join(self.directory, COMMITTED_FILE),
+                      json.dumps({'offset': offset, 'seq': seq}))
+        with self._cond:
+            self._committed_offset, self._committed_seq = offset, seq
+            for _ in range(count):
+                self._pending_times.popleft()
+            self._counters['consumed'] += count
+            self._counters['batches'] += 1
+            self._cond.notify_all()
+        self._drop_consumed_segments()
+
+    def _drop_consumed_segments(self):
+        segments = self._segments()
+        for base, next_base in zip(segments, segments[1:]):
+            if next_base <= self._committed_offset:
+                os.remove(os.path.join(self.directory, _segment_name(base)))
+
+    # -------------------------------
+    # Metrics and Shutdown
+    # -------------------------------
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            if not self._started:
+                return stats
+            stats['depth'] = self._next_seq - self._committed_seq
+            stats['max_pending'] = self.max_pending
+            stats['lag_seconds'] = (round(time.time() - self._pending_times[0], 3)
+                                    if self._pending_times else 0.0)
+            stats['committed_seq'] = self._committed_seq
+        stats['disk_bytes'] = sum(self._segment_size(base) for base in self._segments())
+        return stats
+
+    # Size of a segment, 0 if the reader dropped it after it was listed
+    def _segment_size(self, base):
+        try:
+            return os.path.getsize(os.path.join(self.directory, _segment_name(base)))
+        except FileNotFoundError:
+            return 0
+
+    # Block until everything appended so far has been consumed
+    def drain(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._next_seq
+            while self._started and self._committed_seq < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # Consume what is queued, then stop the threads and close the log
+    def stop(self, timeout=None):
+        if not self._started:
+            return
+        self.drain(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._executor.shutdown()
+        with self._cond:
+            os.fsync(self._log.fileno())
+            self._log.close()
+        self._lock_file.close()
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# -------------------------------
+# Mood Logging Write Path
+# -------------------------------
+# Helpers for the /log_mood hot path in jee.py:
+#   UserIdCache     - username -> user_id, so a mood log does not need a
+#                     User lookup query every time
+#   MoodBatchWriter - group commit: rows from concurrent requests are
+#                     inserted in one transaction, flushed every
+#                     max_delay_ms or max_rows. Each caller gets a Future
+#                     that resolves only after its row is committed. If a
+#                     batch fails, its rows are flushed one at a time so
+#                     only the bad row's caller sees the error.
+
+
+class UserIdCache:
+    def __init__(self, loader, max_entries=100000):
+        self.loader = loader
+        self.max_entries = max_entries
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Cached id, or ask the loader. Unknown usernames are not cached, so a
+    # user registered afterwards is found on the next call.
+    def get(self, username):
+        with self._lock:
+            if username in self._ids:
+                self._ids.move_to_end(username)
+                return self._ids[username]
+        user_id = self.loader(username)
+        if user_id is not None:
+            with self._lock:
+                self._ids[username] = user_id
+                if len(self._ids) > self.max_entries:
+                    self._ids.popitem(last=False)
+        return user_id
+
+    def invalidate(self, username=None):
+        with self._lock:
+            if username is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(username, None)
+
+
+class MoodBatchWriter:
+    def __init__(self, flush, max_rows=500, max_delay_ms=5):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # Queue one row and return a Future that completes once it is committed
+    def submit(self, row):
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Mood writer has been stopped")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mood-writer',
+                                                daemon=True)
+                self._thread.start()
+            self._pending.append((row, future))
+            # Wake the writer for the first row of a batch and for a full one
+            if len(self._pending) == 1 or len(self._pending) >= self.max_rows:
+                self._cond.notify()
+        return future
+
+    # Submit and block until the row is durable
+    def write(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            # Give concurrent requests a short window to join the batch
+            deadline = time.monotonic() + self.max_delay
+            while len(self._pending) < self.max_rows and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_rows]
+            del self._pending[:self.max_rows]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self.flush([row for row, _ in batch])
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                    continue
+                for row, future in batch:
+                    self._flush_one(row, future)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def _flush_one(self, row, future):
+        try:
+            self.flush([row])
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(None)
+
+    # Flush what is queued and stop the writer thread
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# -------------------------------
+# Password Hashing Backends
+# -------------------------------
+# pbkdf2 hashing is deliberately slow, so /register, /login and bulk imports
+# are CPU-bound on it. PasswordHasher moves the work off the request thread:
+#   inline  - hash on the calling thread (the original behaviour)
+#   thread  - bounded thread pool; hashlib.pbkdf2_hmac releases the GIL
+#   process - bounded process pool; uses the spawn start method so that
+#             forking never copies the Flask app's database connections or
+#             writer threads into the workers
+# The pbkdf2 iteration count is configurable per deployment. Hashes keep
+# their method string, so changing it does not break existing passwords.
+
+HASH_METHOD = 'pbkdf2:sha256'
+BACKENDS = ('inline', 'thread', 'process')
+
+
+class PasswordHasher:
+    def __init__(self, backend='process', workers=None, iterations=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown hashing backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.method = f'{HASH_METHOD}:{iterations}' if iterations else HASH_METHOD
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None and self.backend == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+            elif self._executor is None and self.backend == 'process':
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.backend == 'inline':
+            return fn(*args)
+        return self.executor().submit(fn, *args).result()
+
+    def hash(self, password):
+        return self._run(functools.partial(generate_password_hash, method=self.method), password)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    # Hash many passwords at once, in input order
+    def hash_many(self, passwords):
+        passwords = list(passwords)
+        hash_one = functools.partial(generate_password_hash, method=self.method)
+        if self.backend == 'inline' or not passwords:
+            return [hash_one(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (4 * self.workers))
+        return list(self.executor().map(hash_one, passwords, chunksize=chunksize))
+
+    # Awaitable variants for async callers
+    async def hash_async(self, password):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor(), functools.partial(generate_password_hash, method=self.method),
+            password)
+
+    async def verify_async(self, pwhash, password):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor(), check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+# Logins per second for each worker count: `clients` threads play request
+# threads, each verifying a password against one stored hash
+def benchmark_logins(worker_counts, backend='process', iterations=None, logins=200,
+                     clients=None):
+    results = []
+    for workers in worker_counts:
+        hasher = PasswordHasher(backend, workers=workers, iterations=iterations)
+        pwhash = hasher.hash('benchmark-password')  # also starts the pool
+        # Split the logins evenly; the first clients take the remainder
+        per_client, extra = divmod(logins, clients or workers * 2)
+        counts = [per_client + (i < extra) for i in range(clients or workers * 2)]
+        threads = [threading.Thread(target=lambda count=count: [
+                       hasher.verify(pwhash, 'benchmark-password') for _ in range(count)])
+                   for count in counts]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        hasher.shutdown()
+        results.append({'workers': workers, 'logins': logins, 'seconds': round(elapsed, 3),
+                        'logins_per_second': round(logins / elapsed, 1)})
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark login throughput per worker count")
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help="comma-separated worker counts (default: 1,2,4,8)")
+    parser.add_argument('--backend', default='process', choices=BACKENDS)
+    parser.add_argument('--iterations', type=int, default=None,
+                        help="pbkdf2 iterations (default: werkzeug's)")
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.workers.split(',')]
+    print(f"\n🔐 Login throughput ({args.backend} backend, {args.iterations or 'default'} iterations)\n")
+    for row in benchmark_logins(counts, args.backend, args.iterations, args.logins):
+        print(f"{row['workers']:>3} workers : {row['logins_per_second']:>8.1f} logins/s "
+              f"({row['logins']} logins in {row['seconds']:.2f} s)")
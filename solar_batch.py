@@ -0,0 +1,191 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pvlib
+
+from solar_core import MONTHS
+from solar_position import solar_position
+from solar_profiling import stage
+from solar_timezone import timezone_at
+
+# -------------------------------
+# Batch Solar Estimation Engine
+# -------------------------------
+# Scores a whole table of rooftops in one pass instead of running
+# solar_energy_estimator_cli.py once per site. Everything that is shared
+# between sites is computed once: the hourly time grid per (year, tz) and the
+# solar position / Ineichen clear-sky result per unique location. The
+# plane-of-array and energy math then runs as 2-D NumPy arrays
+# (sites x hours), chunked so that memory stays bounded for 50k+ sites.
+# Sites without a 'tz' column get their zone from their coordinates, so a
+# multi-country table builds one time grid per zone. `freq` selects the time
+# step, e.g. '15min' for sub-hourly runs.
+
+SITE_COLUMNS = ['latitude', 'longitude', 'roof_area', 'panel_efficiency',
+                'performance_ratio', 'tilt', 'azimuth', 'year']
+ALBEDO = 0.25  # pvlib.irradiance.get_total_irradiance default
+CHUNK_SIZE = 1024
+
+
+# Read a CSV or Parquet table of sites and check the required columns.
+# panel_efficiency is in percent (e.g. 18), like the CLI prompt.
+def load_sites(path):
+    path = str(path)
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        sites = pd.read_parquet(path)
+    else:
+        sites = pd.read_csv(path)
+    return validate_sites(sites)
+
+
+def validate_sites(sites):
+    missing = [c for c in SITE_COLUMNS if c not in sites.columns]
+    if missing:
+        raise ValueError(f"Site table is missing columns: {', '.join(missing)}")
+    sites = sites.copy()
+    for column in SITE_COLUMNS:
+        sites[column] = pd.to_numeric(sites[column])
+    coords = sites[['latitude', 'longitude']].to_numpy(dtype=float)
+    if not np.isfinite(coords).all():
+        raise ValueError("Site table has missing or non-finite latitude/longitude")
+    sites['year'] = sites['year'].astype(int)
+    if 'tz' not in sites.columns:
+        sites['tz'] = None
+    missing = sites['tz'].isna() | (sites['tz'] == '')
+    if missing.any():
+        sites['tz'] = sites['tz'].astype(object)
+        sites.loc[missing, 'tz'] = timezone_at(sites.loc[missing, 'latitude'].to_numpy(),
+                                               sites.loc[missing, 'longitude'].to_numpy())
+    return sites
+
+
+# Time grid for one year, shared by every site in the same zone. Local
+# clock time, so DST days have 23 or 25 hourly steps.
+@functools.lru_cache(maxsize=256)
+def hourly_times(year, tz='UTC', freq='h'):
+    with stage('date_range'):
+        return pd.date_range(f'{year}-01-01', f'{year + 1}-01-01', freq=freq,
+                             tz=tz, inclusive='left')
+
+
+# Length of one time step in hours, used to turn W/m² into Wh
+def step_hours(times):
+    return pd.Timedelta(times.freq).total_seconds() / 3600
+
+
+# Solar position and Ineichen clear-sky irradiance for one location.
+# Returns plain float64 arrays so they can be stacked across sites. `method`
+# picks the solar position back end (see solar_position.METHODS).
+def clearsky_components(times, latitude, longitude, method=None):
+    with stage('solar_position', method=method or 'default'):
+        solpos = pd.DataFrame(solar_position(times, latitude, longitude, method), index=times)
+    with stage('linke_turbidity'):
+        linke = pvlib.clearsky.lookup_linke_turbidity(times, latitude, longitude)
+    with stage('ineichen'):
+        airmass = pvlib.atmosphere.get_relative_airmass(solpos['apparent_zenith'])
+        airmass = pvlib.atmosphere.get_absolute_airmass(airmass)
+        dni_extra = pvlib.irradiance.get_extra_radiation(times)
+        clearsky = pvlib.clearsky.ineichen(solpos['apparent_zenith'], airmass,
+                                           linke, dni_extra=dni_extra)
+    return {
+        'zenith': solpos['zenith'].to_numpy(dtype=float),
+        'azimuth': solpos['azimuth'].to_numpy(dtype=float),
+        'dni': clearsky['dni'].fillna(0).to_numpy(dtype=float),
+        'ghi': clearsky['ghi'].fillna(0).to_numpy(dtype=float),
+        'dhi': clearsky['dhi'].fillna(0).to_numpy(dtype=float),
+    }
+
+
+# Isotropic plane-of-array irradiance, same model as
+# pvlib.irradiance.get_total_irradiance, but on broadcastable arrays:
+# surface angles are (sites, 1) and the sun/irradiance arrays (sites, hours).
+def plane_of_array(surface_tilt, surface_azimuth, zenith, solar_azimuth,
+                   dni, ghi, dhi, albedo=ALBEDO):
+    tilt = np.radians(surface_tilt)
+    zen = np.radians(zenith)
+    projection = (np.cos(tilt) * np.cos(zen) + np.sin(tilt) * np.sin(zen)
+                  * np.cos(np.radians(solar_azimuth - surface_azimuth)))
+    beam = np.maximum(dni * np.clip(projection, -1, 1), 0)
+    sky_diffuse = dhi * (1 + np.cos(tilt)) * 0.5
+    ground_diffuse = ghi * albedo * (1 - np.cos(tilt)) * 0.5
+    return beam + sky_diffuse + ground_diffuse
+
+
+# Score sites chunk by chunk and yield (row positions, times, energy_wh) where
+# energy_wh is a (chunk, hours) array. This is the building block for the
+# monthly totals below and for callers that want the hourly series.
+def iter_site_energy(sites, chunk_size=CHUNK_SIZE, components=None, freq='h'):
+    components = components or clearsky_components
+    sites = validate_sites(sites).reset_index(drop=True)
+    for (year, tz), group in sites.groupby(['year', 'tz'], sort=False):
+        times = hourly_times(int(year), tz, freq)
+        scale = step_hours(times)
+        group_positions = group.index.to_numpy()
+
+        # One clear-sky run per unique location
+        coords = group[['latitude', 'longitude']].to_numpy(dtype=float)
+        locations, inverse = np.unique(coords, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        with stage('clearsky', locations=len(locations)):
+            per_location = [components(times, lat, lon) for lat, lon in locations]
+            stacked = {name: np.stack([c[name] for c in per_location])
+                       for name in ('zenith', 'azimuth', 'dni', 'ghi', 'dhi')}
+
+        tilt = group['tilt'].to_numpy(dtype=float)[:, None]
+        azimuth = group['azimuth'].to_numpy(dtype=float)[:, None]
+        factor = (group['roof_area'].to_numpy(dtype=float)
+                  * group['panel_efficiency'].to_numpy(dtype=float) / 100
+                  * group['performance_ratio'].to_numpy(dtype=float))[:, None]
+
+        for start in range(0, len(group), chunk_size):
+            rows = slice(start, start + chunk_size)
+            loc = inverse[rows]
+            with stage('transposition', sites=len(loc)):
+                poa = plane_of_array(tilt[rows], azimuth[rows],
+                                     stacked['zenith'][loc], stacked['azimuth'][loc],
+                                     stacked['dni'][loc], stacked['ghi'][loc],
+                                     stacked['dhi'][loc])
+                energy_wh = poa * factor[rows] * scale
+            yield group_positions[rows], times, energy_wh
+
+
+# Sum a (sites, hours) array into (sites, 12) monthly totals
+def monthly_totals(values, times):
+    with stage('resampling'):
+        month = times.month.to_numpy()
+        starts = np.flatnonzero(np.r_[True, month[1:] != month[:-1]])
+        totals = np.zeros(values.shape[:-1] + (12,))
+        totals[..., month[starts] - 1] = np.add.reduceat(values, starts, axis=-1)
+        return totals
+
+
+# Monthly and annual kWh for every row of the site table
+def estimate_fleet(sites, chunk_size=CHUNK_SIZE, components=None, freq='h'):
+    sites = validate_sites(sites)
+    monthly = np.zeros((len(sites), 12))
+    for positions, times, energy_wh in iter_site_energy(sites, chunk_size, components, freq):
+        monthly[positions] = monthly_totals(energy_wh, times) / 1000  # Wh to kWh
+    return fleet_table(sites, monthly)
+
+
+# Attach (sites, 12) monthly kWh and the annual total to the site table
+def fleet_table(sites, monthly):
+    result = sites.copy()
+    for i, month in enumerate(MONTHS):
+        result[month] = monthly[:, i].round(2)
+    result['annual_kwh'] = monthly.sum(axis=1).round(2)
+    return result
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python solar_batch.py sites.csv|sites.parquet [output.csv]")
+    fleet = estimate_fleet(load_sites(sys.argv[1]))
+    if len(sys.argv) > 2:
+        fleet.to_csv(sys.argv[2], index=False)
+        print(f"📁 Estimates for {len(fleet)} sites exported to: {sys.argv[2]}")
+    else:
+        print(fleet.to_string(index=False))
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import solar_batch
+from solar_position import resolve_method
+
+# -------------------------------
+# Clear-Sky Irradiance Cache
+# -------------------------------
+# Solar position and Ineichen clear-sky output for a site and year never
+# change, so they are computed once and kept on disk. Each entry is a
+# directory named by a hash of (rounded lat, rounded lon, year, tz, freq)
+# holding one float32 .npy per column, read back memory-mapped. Coordinates
+# are rounded before hashing so that neighbouring rooftops share an entry,
+# and the cache is capped in size with least-recently-used eviction. The
+# solar position method is part of the key unless it is the exact SPA, so
+# entries written before the method was selectable stay valid.
+
+COLUMNS = ('zenith', 'azimuth', 'dni', 'ghi', 'dhi')
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'solar_irradiance')
+DEFAULT_PRECISION = 2  # decimal places, ~1 km
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class IrradianceCache:
+    def __init__(self, root=DEFAULT_DIR, precision=DEFAULT_PRECISION,
+                 max_bytes=DEFAULT_MAX_BYTES, method=None):
+        self.root = root
+        # spa and spa_numba give the same positions and share entries
+        self.method = resolve_method(method)
+        self.precision = precision
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, times, latitude, longitude):
+        latitude, longitude = self.round(latitude, longitude)
+        spec = {
+            'latitude': latitude,
+            'longitude': longitude,
+            'year': int(times[0].year),
+            'tz': str(times.tz),
+            'freq': times.freqstr,
+            'hours': len(times),
+        }
+        if self.method == 'fast':
+            spec['solar_position'] = self.method
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:32]
+
+    def round(self, latitude, longitude):
+        return (round(float(latitude), self.precision),
+                round(float(longitude), self.precision))
+
+    # Same signature and return value as solar_batch.clearsky_components, so
+    # an instance can be passed straight to solar_batch as `components`
+    def __call__(self, times, latitude, longitude):
+        return self.get(times, latitude, longitude)
+
+    def get(self, times, latitude, longitude):
+        entry = os.path.join(self.root, self.key(times, latitude, longitude))
+        cached = self._load(entry)
+        if cached is not None:
+            return cached
+        latitude, longitude = self.round(latitude, longitude)
+        components = solar_batch.clearsky_components(times, latitude, longitude, self.method)
+        self._store(entry, components)
+        return self._load(entry) or components
+
+    def _load(self, entry):
+        try:
+            components = {name: np.load(os.path.join(entry, f'{name}.npy'), mmap_mode='r')
+                          for name in COLUMNS}
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(entry)  # mark as recently used for eviction
+        return components
+
+    # Write into a temporary directory and rename it into place, so that
+    # concurrent readers and writers never see a half-written entry
+    def _store(self, entry, components):
+        staging = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            for name in COLUMNS:
+                np.save(os.path.join(staging, f'{name}.npy'),
+                        np.asarray(components[name], dtype=np.float32))
+            os.rename(staging, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(path))
+                yield os.stat(path).st_mtime, size, path
+            except FileNotFoundError:
+                continue
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    # Drop least recently used entries until the cache fits under max_bytes
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in list(self.entries()):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,205 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from solar_lut import daily_insolation, days_in_month
+from solar_profiling import stage
+
+# -------------------------------
+# Solar Estimation Core
+# -------------------------------
+# One importable model shared by estimator.py (Tk), seestimator.py (CLI) and
+# solar_energy_estimator_cli.py (pvlib CLI). Two back ends produce the same
+# result:
+#   heuristic - interpolated from a precomputed clear-sky lookup table
+#               (solar_lut), microseconds per site, no pvlib needed
+#   pvlib     - hourly clear-sky model through solar_batch
+# pvlib, plotly and matplotlib are only imported when the selected back end
+# or output actually needs them, so importing this module is cheap.
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December']
+
+# (field, prompt, parser) for every site parameter, in prompt order
+SITE_FIELDS = [
+    ('latitude', "Enter Latitude (e.g., 26.91): ", float),
+    ('longitude', "Enter Longitude (e.g., 75.78): ", float),
+    ('roof_area', "Enter Roof Area in m² (e.g., 100): ", float),
+    ('panel_efficiency', "Enter Panel Efficiency % (e.g., 18): ", float),
+    ('performance_ratio', "Enter Performance Ratio (e.g., 0.75): ", float),
+    ('year', "Enter Year (e.g., 2024): ", int),
+    ('tilt', "Enter Tilt Angle in degrees (e.g., 27): ", float),
+    ('azimuth', "Enter Azimuth Angle in degrees (180 for South): ", float),
+]
+
+# monthly: 12 kWh values; daily: average daily kWh where the back end has one;
+# hourly: Series of Wh per time step for the pvlib back end, else None
+EstimateResult = namedtuple('EstimateResult', ['site', 'backend', 'monthly', 'annual',
+                                               'daily', 'hourly'])
+
+
+# Parse raw values (strings from input() or Tk entries) into a site dict.
+# panel_efficiency stays in percent, like the prompts and solar_batch.
+# Fields listed in `optional` may be blank and come back as None.
+def parse_site(values, optional=()):
+    site = {}
+    for field, _, parser in SITE_FIELDS:
+        raw = values.get(field)
+        if field in optional and (raw is None or str(raw).strip() == ''):
+            site[field] = None
+        else:
+            site[field] = parser(str(raw).strip())
+    return site
+
+
+def prompt_site(ask=input, optional=(), hints=None):
+    hints = hints or {}
+    return parse_site({field: ask(hints.get(field, prompt)) for field, prompt, _ in SITE_FIELDS},
+                      optional)
+
+
+# -------------------------------
+# Back Ends
+# -------------------------------
+
+# Monthly kWh for arrays of sites from the lookup table:
+# Energy (kWh) = Irradiance (kWh/m²/day) * Days * Area (m²) * Efficiency * Performance Ratio
+def heuristic_monthly(latitude, longitude, roof_area, panel_efficiency, performance_ratio,
+                      year, tilt, azimuth):
+    irradiance = daily_insolation(latitude, longitude, tilt, azimuth)
+    years, inverse = np.unique(np.broadcast_to(np.asarray(year), irradiance.shape[:1]),
+                               return_inverse=True)
+    days = np.stack([days_in_month(int(y)) for y in years])[inverse.ravel()]
+    factor = (np.asarray(roof_area, dtype=float) * np.asarray(panel_efficiency, dtype=float)
+              / 100 * np.asarray(performance_ratio, dtype=float))
+    return irradiance * days * np.reshape(factor, (-1, 1))
+
+
+# Fast estimate: clear-sky lookup table with true month lengths
+def estimate_heuristic(site):
+    monthly_energy = heuristic_monthly(**{field: site[field] for field, _, _ in SITE_FIELDS})[0]
+    annual_energy = monthly_energy.sum()
+    daily_energy = annual_energy / days_in_month(site['year']).sum()
+    return EstimateResult(site, 'heuristic', monthly_energy, annual_energy, daily_energy, None)
+
+
+# Heuristic estimate for a whole site table (same columns as solar_batch),
+# returning the site columns plus the 12 months and annual_kwh
+def estimate_heuristic_fleet(sites):
+    monthly = heuristic_monthly(**{field: sites[field].to_numpy() for field, _, _ in SITE_FIELDS})
+    result = sites.copy()
+    for i, month in enumerate(MONTHS):
+        result[month] = monthly[:, i].round(2)
+    result['annual_kwh'] = monthly.sum(axis=1).round(2)
+    return result
+
+
+# Hourly clear-sky model: pvlib solar position + Ineichen, isotropic POA
+def estimate_pvlib(site, components=None, freq='h'):
+    import solar_batch
+    from solar_cache import IrradianceCache
+
+    sites = pd.DataFrame([site])
+    positions, times, energy_wh = next(solar_batch.iter_site_energy(
+        sites, components=components or IrradianceCache(), freq=freq))
+    monthly_energy = solar_batch.monthly_totals(energy_wh, times)[0] / 1000  # Wh to kWh
+    hourly = pd.Series(energy_wh[0], index=times, name='energy_wh')
+    return EstimateResult(site, 'pvlib', monthly_energy, monthly_energy.sum(), None, hourly)
+
+
+BACKENDS = {
+    'heuristic': estimate_heuristic,
+    'pvlib': estimate_pvlib,
+}
+
+
+def estimate(site, backend='heuristic', **options):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown back end {backend!r}, expected one of {', '.join(BACKENDS)}")
+    with stage('estimate', backend=backend):
+        return BACKENDS[backend](site, **options)
+
+
+# Fill in a blank tilt and/or azimuth with the best clear-sky orientation
+def resolve_orientation(site, components=None):
+    if site['tilt'] is not None and site['azimuth'] is not None:
+        return site, False
+    from solar_cache import IrradianceCache
+    from solar_sweep import sweep_orientation
+
+    with stage('orientation_sweep'):
+        sweep = sweep_orientation(
+            site['latitude'], site['longitude'], site['year'],
+            tilts=None if site['tilt'] is None else [site['tilt']],
+            azimuths=None if site['azimuth'] is None else [site['azimuth']],
+            refine=True, components=components or IrradianceCache())
+    return dict(site, tilt=sweep.best_tilt, azimuth=sweep.best_azimuth), True
+
+
+# -------------------------------
+# Output
+# -------------------------------
+
+def monthly_table(result):
+    return pd.DataFrame({
+        'Month': MONTHS,
+        'Estimated Energy (kWh)': np.round(result.monthly, 2),
+    })
+
+
+def summary_lines(result):
+    monthly = result.monthly
+    lines = [f"🔆 Total Annual Energy      : {result.annual:.2f} kWh"]
+    if result.daily is not None:
+        lines.append(f"📈 Average Daily Output     : {result.daily:.2f} kWh")
+    else:
+        lines.append(f"📈 Average Monthly Output   : {monthly.mean():.2f} kWh")
+    lines.append(f"✅ Highest Monthly Output   : {monthly.max():.2f} kWh ({MONTHS[monthly.argmax()]})")
+    lines.append(f"⚠️  Lowest Monthly Output    : {monthly.min():.2f} kWh ({MONTHS[monthly.argmin()]})")
+    return lines
+
+
+def export_result(result, base_name):
+    from solar_export import export_frame
+
+    with stage('export'):
+        return export_frame(monthly_table(result), base_name)
+
+
+# Simple matplotlib bar chart. The plot stage covers building the figure;
+# showing it waits on the user, so both plotters do that outside the stage.
+def plot_matplotlib(result, show=True):
+    with stage('plot', library='matplotlib'):
+        import matplotlib.pyplot as plt
+
+        table = monthly_table(result)
+        fig = plt.figure(figsize=(10, 6))
+        plt.bar(table['Month'], table['Estimated Energy (kWh)'], color='skyblue')
+        plt.xlabel('Month')
+        plt.ylabel('Energy (kWh)')
+        plt.title('Monthly Solar Energy Output')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+    if show:
+        plt.show()
+    return fig
+
+
+# Interactive plotly bar chart
+def plot_plotly(result, show=True):
+    with stage('plot', library='plotly'):
+        import plotly.express as px
+
+        fig = px.bar(monthly_table(result), x='Month', y='Estimated Energy (kWh)',
+                     color='Estimated Energy (kWh)', color_continuous_scale='sunset',
+                     title='Monthly Solar Energy Output', text_auto='.2s')
+        fig.update_layout(
+            xaxis_title='Month',
+            yaxis_title='Energy (kWh)',
+            template='plotly_white',
+            title_x=0.5
+        )
+    if show:
+        fig.show()
+    return fig
@@ -1,94 +1,121 @@
-import pandas as pd
-import pvlib
-import plotly.express as px
+import argparse
+import os
+
 from tabulate import tabulate
 
-# -------------------------------
-# 1. Get User Input
-# -------------------------------
-print("\n🔧 Solar Energy Estimator Configuration\n")
-
-latitude = float(input("Enter Latitude (e.g., 26.91): "))
-longitude = float(input("Enter Longitude (e.g., 75.78): "))
-roof_area = float(input("Enter Roof Area in m² (e.g., 100): "))
-panel_efficiency = float(input("Enter Panel Efficiency % (e.g., 18): ")) / 100
-performance_ratio = float(input("Enter Performance Ratio (e.g., 0.75): "))
-year = int(input("Enter Year (e.g., 2024): "))
-tilt = float(input("Enter Tilt Angle in degrees (e.g., 27): "))
-azimuth = float(input("Enter Azimuth Angle in degrees (180 for South): "))
-
-# -------------------------------
-# 2. Calculate Solar Output
-# -------------------------------
-print("\n🔄 Calculating solar potential, please wait...\n")
-
-# Generate hourly time range for the specified year
-times = pd.date_range(f'{year}-01-01', f'{year}-12-31 23:00:00', freq='H', tz='Asia/Kolkata')
-
-# Solar position and irradiance model
-solpos = pvlib.solarposition.get_solarposition(times, latitude, longitude)
-clearsky = pvlib.clearsky.ineichen(times, latitude, longitude)
-
-# Direct Normal Irradiance (DNI), Global Horizontal Irradiance (GHI), and Diffuse Horizontal Irradiance (DHI)
-dni = clearsky['dni']
-ghi = clearsky['ghi']
-dhi = clearsky['dhi']
-
-# Calculate the total irradiance on a tilted surface using solar position and irradiance
-irradiance = pvlib.irradiance.get_total_irradiance(
-    tilt, azimuth,
-    solpos['zenith'], solpos['azimuth'],
-    dni, ghi, dhi
-)
-poa_irradiance = irradiance['poa_global']  # Plane of array irradiance
-
-# Energy produced (in Wh) for the given roof area, panel efficiency, and performance ratio
-energy_wh = poa_irradiance * roof_area * panel_efficiency * performance_ratio
-
-# Resample to monthly energy and calculate annual energy
-monthly_energy = energy_wh.resample('M').sum() / 1000  # Convert Wh to kWh
-annual_energy = energy_wh.sum() / 1000  # Annual energy in kWh
-
-# -------------------------------
-# 3. Display Results
-# -------------------------------
-monthly_df = pd.DataFrame({
-    'Month': monthly_energy.index.strftime('%B'),
-    'Estimated Energy (kWh)': monthly_energy.round(2).values
-})
-
-# Display monthly energy output in tabular format
-print("\n📊 Monthly Energy Output:\n")
-print(tabulate(monthly_df, headers='keys', tablefmt='pretty'))
-
-# Display a summary of the results
-print("\n📌 Summary")
-print(f"🔆 Total Annual Energy      : {annual_energy:.2f} kWh")
-print(f"📈 Average Monthly Output   : {monthly_energy.mean():.2f} kWh")
-print(f"✅ Highest Monthly Output   : {monthly_energy.max():.2f} kWh ({monthly_energy.idxmax().strftime('%B')})")
-print(f"⚠️  Lowest Monthly Output    : {monthly_energy.min():.2f} kWh ({monthly_energy.idxmin().strftime('%B')})")
-
-# -------------------------------
-# 4. Export to Excel
-# -------------------------------
-excel_file = "solar_output.xlsx"
-monthly_df.to_excel(excel_file, index=False)
-print(f"\n📁 Monthly data exported to: {excel_file}")
-
-# -------------------------------
-# 5. Interactive Graph
-# -------------------------------
-fig = px.bar(monthly_df, x='Month', y='Estimated Energy (kWh)',
-             color='Estimated Energy (kWh)', color_continuous_scale='sunset',
-             title='Monthly Solar Energy Output', text_auto='.2s')
-
-# Update graph layout
-fig.update_layout(
-    xaxis_title='Month',
-    yaxis_title='Energy (kWh)',
-    template='plotly_white',
-    title_x=0.5
-)
-
-# Display graph
-fig.show()
+import solar_profiling
+from solar_cache import IrradianceCache
+from solar_core import (estimate, export_result, monthly_table, plot_plotly, prompt_site,
+                        resolve_orientation, summary_lines)
+from solar_position import DEFAULT_METHOD, METHODS
+from solar_profiling import stage
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive pvlib solar energy estimate")
+    parser.add_argument('--solar-position', choices=METHODS, default=DEFAULT_METHOD,
+                        help="solar position algorithm: exact SPA, numba SPA or fast "
+                             "approximation (see solar_position.py for error bounds)")
+    parser.add_argument('--freq', default='h',
+                        help="time step of the clear-sky model, e.g. h or 15min")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write per-stage timings as JSON lines ('-' for stderr)")
+    parser.add_argument('--profile-prometheus', metavar='FILE',
+                        help="write per-stage totals in the Prometheus text format")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="add tracemalloc memory deltas to every stage")
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help="capture cProfile stats for the run and print the top calls")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile or args.profile_prometheus or args.profile_memory or args.cprofile:
+        solar_profiling.configure(jsonl=args.profile or '-', prometheus=args.profile_prometheus,
+                                  memory=args.profile_memory, cprofile=args.cprofile)
+
+    # -------------------------------
+    # 1. Get User Input
+    # -------------------------------
+    print("\n🔧 Solar Energy Estimator Configuration\n")
+    site = prompt_site(optional=('tilt', 'azimuth'), hints={
+        'tilt': "Enter Tilt Angle in degrees (e.g., 27, blank for optimal): ",
+        'azimuth': "Enter Azimuth Angle in degrees (180 for South, blank for optimal): ",
+    })
+
+    # Find the best orientation for any angle left blank
+    cache = IrradianceCache(method=args.solar_position)
+    site, optimised = resolve_orientation(site, components=cache)
+    if optimised:
+        print(f"\n🧭 Optimal orientation: tilt {site['tilt']:.1f}°, azimuth {site['azimuth']:.1f}°")
+
+    # -------------------------------
+    # 2. Calculate Solar Output
+    # -------------------------------
+    print("\n🔄 Calculating solar potential, please wait...\n")
+
+    # Hourly pvlib clear-sky model; solar position and irradiance are read
+    # from the on-disk cache when this neighbourhood has been computed before.
+    # Set SOLAR_AOD_RASTER (or SOLAR_PM25_RASTER) to a local .npy grid to
+    # derate the clear sky for aerosol load.
+    components = cache
+    model = f"{args.solar_position}_{args.freq}"
+    raster_path = os.environ.get('SOLAR_AOD_RASTER') or os.environ.get('SOLAR_PM25_RASTER')
+    if raster_path:
+        from aerosol_derate import AerosolDerate, Raster
+
+        kind = 'aod' if os.environ.get('SOLAR_AOD_RASTER') else 'pm25'
+        components = AerosolDerate(cache, **{kind: Raster(raster_path)})
+        model += f"_{kind}-{os.path.splitext(os.path.basename(raster_path))[0]}"
+        print(f"🌫️ Derating for aerosols using: {raster_path}\n")
+    result = estimate(site, 'pvlib', components=components, freq=args.freq)
+    print(f"🕒 Time zone: {result.hourly.index.tz} ({result.hourly.index.freqstr} steps)\n")
+
+    # Keep the hourly series with daily/weekly/monthly rollups for dashboards
+    from solar_timeseries import HourlyStore
+
+    # Every input that changes the energy is part of the key: the system and
+    # the model (solar position method, time step, aerosol raster), so runs
+    # that differ in either do not overwrite each other's series
+    site_id = (f"{site['latitude']:.4f}_{site['longitude']:.4f}_{site['tilt']:g}_"
+               f"{site['azimuth']:g}_{site['roof_area']:g}_{site['panel_efficiency']:g}_"
+               f"{site['performance_ratio']:g}_{model}")
+    with stage('hourly_store'):
+        HourlyStore("solar_timeseries").write(site_id, site['year'], result.hourly.to_numpy(),
+                                              tz=str(result.hourly.index.tz),
+                                              freq=result.hourly.index.freqstr)
+
+    # -------------------------------
+    # 3. Display Results
+    # -------------------------------
+    print("\n📊 Monthly Energy Output:\n")
+    print(tabulate(monthly_table(result), headers='keys', tablefmt='pretty'))
+
+    print("\n📌 Summary")
+    for line in summary_lines(result):
+        print(line)
+
+    # -------------------------------
+    # 4. Export to Excel
+    # -------------------------------
+    # Written in the background while the graph is rendered, one file per run
+    export = export_result(result, "solar_output")
+    print(f"\n📁 Monthly data exported to: {export.paths['xlsx']}")
+
+    # -------------------------------
+    # 5. Interactive Graph
+    # -------------------------------
+    plot_plotly(result)
+
+    # Make sure the export has finished before exiting; raises on write errors
+    with stage('export_wait'):
+        export.close()
+
+    if args.cprofile:
+        solar_profiling.profiler.close()
+        solar_profiling.print_cprofile(args.cprofile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Streaming Result Export
+# -------------------------------
+# Writes estimation results incrementally instead of building one big
+# DataFrame and calling to_excel on a fixed filename. Every frame passed to
+# ResultWriter.write becomes one Parquet row group and/or is appended to a
+# write-only (constant-memory) xlsx sheet. Writing happens on a background
+# thread behind a small bounded queue, and every run gets its own file name.
+
+FORMATS = ('parquet', 'xlsx')
+QUEUE_SIZE = 4
+XLSX_MAX_ROWS = 1048575  # one header row less than Excel's sheet limit
+
+
+# Unique, sortable id for one run, e.g. 20240131-142501-3f9c2a
+def new_run_id():
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def run_path(base_name, fmt, directory='.', run_id=None):
+    return os.path.join(directory, f"{base_name}_{run_id or new_run_id()}.{fmt}")
+
+
+class ResultWriter:
+    def __init__(self, base_name, formats=('parquet',), directory='.', run_id=None,
+                 sheet_name='Results'):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+        self.run_id = run_id or new_run_id()
+        self.paths = {fmt: run_path(base_name, fmt, directory, self.run_id) for fmt in formats}
+        self.sheet_name = sheet_name
+        self.rows = 0
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._error = None
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Queue one frame. Blocks when the writer is QUEUE_SIZE frames behind,
+    # so a fast producer cannot pile results up in memory.
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        if self._finished:
+            raise RuntimeError("ResultWriter is already finished")
+        self._queue.put(frame)
+
+    # Stop taking frames and let the background thread finish the files
+    # without waiting for it
+    def finish(self):
+        if not self._finished:
+            self._finished = True
+            self._queue.put(None)
+
+    # True once the files are finished (or writing failed), so close() will
+    # not block
+    def done(self):
+        return not self._thread.is_alive()
+
+    # Finish writing and return {format: path}. Raises the first write error.
+    def close(self):
+        self.finish()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.paths
+
+    def _run(self):
+        parquet_writer = workbook = sheet = None
+        drained = False
+        try:
+            while (frame := self._queue.get()) is not None:
+                if 'parquet' in self.paths:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    if parquet_writer is None:
+                        table = pa.Table.from_pandas(frame, preserve_index=False)
+                        parquet_writer = pq.ParquetWriter(self.paths['parquet'], table.schema)
+                    else:
+                        table = pa.Table.from_pandas(frame, preserve_index=False,
+                                                     schema=parquet_writer.schema)
+                    parquet_writer.write_table(table)
+                if 'xlsx' in self.paths:
+                    if workbook is None:
+                        from openpyxl import Workbook
+
+                        workbook = Workbook(write_only=True)
+                        sheet = workbook.create_sheet(self.sheet_name)
+                        sheet.append([str(column) for column in frame.columns])
+                    if self.rows + len(frame) > XLSX_MAX_ROWS:
+                        raise ValueError("Too many rows for an xlsx sheet; use Parquet")
+                    for row in frame.itertuples(index=False):
+                        sheet.append([value.item() if isinstance(value, np.generic) else value
+                                      for value in row])
+                self.rows += len(frame)
+            drained = True
+            # Saving is part of the write, so its errors reach close() too
+            if parquet_writer is not None:
+                parquet_writer, finished = None, parquet_writer
+                finished.close()
+            if workbook is not None:
+                workbook.save(self.paths['xlsx'])
+        except Exception as exc:
+            self._error = exc
+            if not drained:
+                while self._queue.get() is not None:
+                    pass
+        finally:
+            if parquet_writer is not None:
+                parquet_writer.close()
+
+
+# Write one small frame (e.g. a 12-month table) in the background. Returns
+# the ResultWriter right away; call close() on it once to wait for the file
+# and raise any write error.
+def export_frame(frame, base_name, formats=('xlsx',), directory='.'):
+    writer = ResultWriter(base_name, formats, directory)
+    writer.write(frame)
+    writer.finish()
+    return writer
+
+
+# Stream a fleet run chunk by chunk. Monthly rows carry the site columns
+# plus the 12 months and the annual total. With hourly=True the output is
+# long-format (site, timestamp, energy_wh) instead.
+def export_fleet(sites, writer, hourly=False, chunk_size=None, components=None, freq='h'):
+    import solar_batch
+
+    sites = solar_batch.validate_sites(sites).reset_index(drop=True)
+    chunk_size = chunk_size or (64 if hourly else solar_batch.CHUNK_SIZE)
+    for positions, times, energy_wh in solar_batch.iter_site_energy(sites, chunk_size,
+                                                                    components, freq):
+        if hourly:
+            writer.write(pd.DataFrame({
+                'site': np.repeat(positions, len(times)),
+                'timestamp': np.tile(times.tz_convert('UTC').tz_localize(None), len(positions)),
+                'energy_wh': energy_wh.astype(np.float32).ravel(),
+            }))
+        else:
+            monthly = solar_batch.monthly_totals(energy_wh, times) / 1000
+            writer.write(solar_batch.fleet_table(sites.iloc[positions], monthly))
+    return writer
@@ -0,0 +1,109 @@
+import functools
+import os
+
+import numpy as np
+
+# -------------------------------
+# Precomputed Irradiance Lookup Table
+# -------------------------------
+# Fast path for the heuristic back end. Mean daily plane-of-array clear-sky
+# insolation (kWh/m²/day) is generated once offline from the same pvlib
+# pipeline as solar_batch, on a latitude x month x tilt x azimuth grid
+# averaged over longitude. A second, small latitude x longitude x month
+# table holds each longitude's GHI relative to that average, which captures
+# the regional turbidity difference. Lookups are multilinear interpolation
+# on both tables, vectorised over any number of sites.
+
+LUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solar_irradiance_lut.npz')
+
+LATITUDES = np.arange(-60, 61, 5.0)
+LONGITUDES = np.arange(-180, 181, 30.0)  # 180 repeats -180 for wrap-around
+TILTS = np.arange(0, 91, 10.0)
+AZIMUTHS = np.arange(0, 361, 30.0)  # 360 repeats 0 for wrap-around
+REFERENCE_YEAR = 2023
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def days_in_month(year):
+    days = DAYS_IN_MONTH.copy()
+    if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        days[1] = 29
+    return days
+
+
+# Generate the tables with pvlib. Takes well under a minute; run
+# `python solar_lut.py` after changing the grid or the clear-sky model.
+def build_lut(path=LUT_PATH):
+    import solar_batch
+
+    times = solar_batch.hourly_times(REFERENCE_YEAR, 'UTC')
+    days = days_in_month(REFERENCE_YEAR)
+    tilt, azimuth = np.meshgrid(TILTS, AZIMUTHS, indexing='ij')
+    tilt, azimuth = tilt.reshape(-1, 1), azimuth.reshape(-1, 1)
+
+    poa = np.zeros((len(LATITUDES), 12, len(TILTS), len(AZIMUTHS)))
+    ghi = np.zeros((len(LATITUDES), len(LONGITUDES), 12))
+    for i, latitude in enumerate(LATITUDES):
+        for j, longitude in enumerate(LONGITUDES[:-1]):
+            c = solar_batch.clearsky_components(times, latitude, longitude)
+            hourly = solar_batch.plane_of_array(tilt, azimuth, c['zenith'], c['azimuth'],
+                                                c['dni'], c['ghi'], c['dhi'])
+            monthly = solar_batch.monthly_totals(hourly, times) / 1000 / days
+            poa[i] += monthly.T.reshape(12, len(TILTS), len(AZIMUTHS))
+            ghi[i, j] = solar_batch.monthly_totals(c['ghi'], times)
+        poa[i] /= len(LONGITUDES) - 1
+        ghi[i, -1] = ghi[i, 0]
+        mean = ghi[i, :-1].mean(axis=0)
+        ghi[i] = np.divide(ghi[i], mean, out=np.ones_like(ghi[i]), where=mean > 0)
+
+    np.savez(path, poa=poa.astype(np.float32), longitude_factor=ghi.astype(np.float32),
+             latitudes=LATITUDES, longitudes=LONGITUDES, tilts=TILTS, azimuths=AZIMUTHS)
+    load_lut.cache_clear()
+    return path
+
+
+@functools.lru_cache(maxsize=1)
+def load_lut(path=LUT_PATH):
+    with np.load(path) as lut:
+        return {name: lut[name] for name in lut.files}
+
+
+# Lower grid index and weight of each value along one regular axis
+def _locate(values, grid):
+    values = np.clip(values, grid[0], grid[-1])
+    position = (values - grid[0]) / (grid[1] - grid[0])
+    lower = np.minimum(position.astype(int), len(grid) - 2)
+    return lower, position - lower
+
+
+# Mean daily plane-of-array insolation (kWh/m²/day) for each site and month,
+# shape (sites, 12). Latitudes beyond ±60° are clamped to the table edge.
+def daily_insolation(latitude, longitude, tilt, azimuth):
+    lut = load_lut()
+    latitude, longitude, tilt, azimuth = (np.atleast_1d(np.asarray(a, dtype=float))
+                                          for a in np.broadcast_arrays(latitude, longitude,
+                                                                       tilt, azimuth))
+    i, wi = _locate(latitude, lut['latitudes'])
+    j, wj = _locate(tilt, lut['tilts'])
+    k, wk = _locate(np.mod(azimuth, 360), lut['azimuths'])
+    poa = lut['poa']
+
+    result = np.zeros(latitude.shape + (12,))
+    for di, fi in ((0, 1 - wi), (1, wi)):
+        for dj, fj in ((0, 1 - wj), (1, wj)):
+            for dk, fk in ((0, 1 - wk), (1, wk)):
+                weight = (fi * fj * fk)[:, None]
+                result += weight * poa[i + di, :, j + dj, k + dk]
+
+    m, wm = _locate(np.mod(longitude + 180, 360) - 180, lut['longitudes'])
+    factor = lut['longitude_factor']
+    correction = np.zeros_like(result)
+    for di, fi in ((0, 1 - wi), (1, wi)):
+        for dm, fm in ((0, 1 - wm), (1, wm)):
+            correction += (fi * fm)[:, None] * factor[i + di, m + dm]
+    return result * correction
+
+
+if __name__ == '__main__':
+    print(f"📁 Lookup table written to: {build_lut()}")
@@ -0,0 +1,206 @@
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+# -------------------------------
+# Stage Timing and Profiling
+# -------------------------------
+# Named stages across the solar pipeline (date_range, solar_position,
+# linke_turbidity, ineichen, transposition, resampling, export, plot, ...)
+# are wrapped in `with stage('name'):`. When profiling is off, which is the
+# default, a stage costs one attribute check. When it is on, every finished
+# stage is written as one JSON line, and totals per stage can be written in
+# the Prometheus text format for a node_exporter textfile collector.
+# Optional extras:
+#   memory   - tracemalloc current-memory delta and peak inside each stage
+#   cprofile - cProfile over the outermost stages, dumped as pstats on close
+#
+# Configure from code with configure(...), or for batch runs from the
+# environment. solar_shard's worker processes inherit it and append their
+# stages to the same JSON lines file, flushing at the end of every shard
+# because pool workers exit without running atexit; the Prometheus totals
+# and the cProfile dump cover the parent process only.
+#   SOLAR_PROFILE=path.jsonl            JSON lines, appended
+#   SOLAR_PROFILE_PROMETHEUS=path.prom  totals, rewritten on exit
+#   SOLAR_PROFILE_MEMORY=1
+#   SOLAR_PROFILE_CPROFILE=path.pstats
+
+
+class StageProfiler:
+    def __init__(self, jsonl=None, prometheus=None, memory=False, cprofile=None):
+        self.jsonl = jsonl
+        self.prometheus = prometheus
+        self.memory = memory
+        self.cprofile = cprofile
+        self.enabled = bool(jsonl or prometheus or memory or cprofile)
+        self.totals = defaultdict(lambda: {'calls': 0, 'seconds': 0.0,
+                                           'memory_delta_bytes': 0, 'memory_peak_bytes': 0})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stream = None
+        self._profile = cProfile.Profile() if cprofile else None
+        self._profiling = 0
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(jsonl=environ.get('SOLAR_PROFILE') or None,
+                   prometheus=environ.get('SOLAR_PROFILE_PROMETHEUS') or None,
+                   memory=environ.get('SOLAR_PROFILE_MEMORY', '') not in ('', '0'),
+                   cprofile=environ.get('SOLAR_PROFILE_CPROFILE') or None)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        # Peaks are reset per stage, so the enclosing stage keeps the
+        # highest peak of its children in its own frame
+        frame = {'child_peak': 0}
+        if self.memory:
+            frame['start'], frame['outer_peak'] = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        self._start_profile()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self._stop_profile()
+            stack.pop()
+            record = {'stage': name, 'seconds': seconds}
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['child_peak'])
+                record['memory_delta_bytes'] = current - frame['start']
+                record['memory_peak_bytes'] = peak - frame['start']
+                if stack:
+                    stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak,
+                                                  frame['outer_peak'])
+            if stack:
+                record['depth'] = len(stack)
+            if labels:
+                record['labels'] = labels
+            self._record(record)
+
+    def _start_profile(self):
+        if self._profile is None:
+            return
+        with self._lock:
+            self._profiling += 1
+            if self._profiling == 1:
+                self._profile.enable()
+
+    def _stop_profile(self):
+        if self._profile is None:
+            return
+        with self._lock:
+            self._profiling -= 1
+            if self._profiling == 0:
+                self._profile.disable()
+
+    def _record(self, record):
+        with self._lock:
+            total = self.totals[record['stage']]
+            total['calls'] += 1
+            total['seconds'] += record['seconds']
+            total['memory_delta_bytes'] += record.get('memory_delta_bytes', 0)
+            total['memory_peak_bytes'] = max(total['memory_peak_bytes'],
+                                             record.get('memory_peak_bytes', 0))
+            if self.jsonl:
+                if self._stream is None:
+                    self._stream = (sys.stderr if self.jsonl == '-'
+                                    else open(self.jsonl, 'a', buffering=1))
+                record = dict(record, time=time.time(), pid=os.getpid())
+                self._stream.write(json.dumps(record) + '\n')
+
+    # Totals per stage in the Prometheus text exposition format
+    def prometheus_text(self):
+        lines = [
+            '# HELP solar_stage_seconds_total Wall time spent in each pipeline stage.',
+            '# TYPE solar_stage_seconds_total counter',
+        ]
+        with self._lock:
+            totals = {name: dict(total) for name, total in self.totals.items()}
+        for name, total in sorted(totals.items()):
+            lines.append(f'solar_stage_seconds_total{{stage="{name}"}} {total["seconds"]:.6f}')
+        lines += ['# HELP solar_stage_calls_total Number of times each stage ran.',
+                  '# TYPE solar_stage_calls_total counter']
+        for name, total in sorted(totals.items()):
+            lines.append(f'solar_stage_calls_total{{stage="{name}"}} {total["calls"]}')
+        if self.memory:
+            lines += ['# HELP solar_stage_memory_delta_bytes_total Net traced memory '
+                      'allocated by each stage.',
+                      '# TYPE solar_stage_memory_delta_bytes_total counter']
+            for name, total in sorted(totals.items()):
+                lines.append(f'solar_stage_memory_delta_bytes_total{{stage="{name}"}} '
+                             f'{total["memory_delta_bytes"]}')
+            lines += ['# HELP solar_stage_memory_peak_bytes Highest traced memory above '
+                      'the stage start.',
+                      '# TYPE solar_stage_memory_peak_bytes gauge']
+            for name, total in sorted(totals.items()):
+                lines.append(f'solar_stage_memory_peak_bytes{{stage="{name}"}} '
+                             f'{total["memory_peak_bytes"]}')
+        return '\n'.join(lines) + '\n'
+
+    # Push buffered JSON lines to the file, for processes that end without
+    # running close()
+    def flush(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.flush()
+
+    # Flush the outputs: JSON lines stream, Prometheus file, pstats dump
+    def close(self):
+        if self._stream is not None and self._stream is not sys.stderr:
+            self._stream.close()
+        self._stream = None
+        if self.prometheus and self.totals:
+            staging = f'{self.prometheus}.{os.getpid()}.tmp'
+            with open(staging, 'w') as f:
+                f.write(self.prometheus_text())
+            os.replace(staging, self.prometheus)
+        if self._profile is not None and self.cprofile:
+            self._profile.dump_stats(self.cprofile)
+
+
+profiler = StageProfiler.from_env()
+
+
+def stage(name, **labels):
+    return profiler.stage(name, **labels)
+
+
+# Replace the global profiler, e.g. from command-line flags
+def configure(**options):
+    global profiler
+    profiler.close()
+    profiler = StageProfiler(**options)
+    return profiler
+
+
+@atexit.register
+def _close():
+    profiler.close()
+
+
+# Print the hottest functions of a pstats dump
+def print_cprofile(path, limit=25):
+    import pstats
+
+    pstats.Stats(path).sort_stats('cumulative').print_stats(limit)
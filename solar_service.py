@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from flask import Flask, request, jsonify
+
+import solar_batch
+from solar_cache import IrradianceCache
+
+# -------------------------------
+# Solar Estimation HTTP Service
+# -------------------------------
+# Long-running JSON front end for the pvlib clear-sky estimate. pvlib and
+# pandas are imported once at startup. Requests are reduced to a key of
+# rounded lat/lon, year and orientation; identical keys that are already
+# being computed share that computation instead of starting a new one.
+# Energy scales linearly with roof area, efficiency and performance ratio,
+# so only the per-m² result is computed and each request rescales it.
+
+app = Flask(__name__)
+app.config['SOLAR_WORKERS'] = 4
+app.config['SOLAR_LATENCY_WINDOW'] = 10000
+
+cache = IrradianceCache()
+executor = ThreadPoolExecutor(max_workers=app.config['SOLAR_WORKERS'])
+
+_inflight = {}
+_inflight_lock = threading.RLock()
+_latencies = deque(maxlen=app.config['SOLAR_LATENCY_WINDOW'])
+_counters = {'requests': 0, 'computations': 0, 'coalesced': 0, 'errors': 0}
+_metrics_lock = threading.Lock()
+
+
+def _count(name):
+    with _metrics_lock:
+        _counters[name] += 1
+
+
+# Monthly kWh per m² of panel at 100% efficiency for one key, unrounded so
+# that scaling by a large roof does not scale a rounding error too
+def _compute(key):
+    _count('computations')
+    latitude, longitude, year, tilt, azimuth = key
+    site = pd.DataFrame([{
+        'latitude': latitude, 'longitude': longitude, 'year': year,
+        'tilt': tilt, 'azimuth': azimuth,
+        'roof_area': 1.0, 'panel_efficiency': 100.0, 'performance_ratio': 1.0,
+    }])
+    for _, times, energy_wh in solar_batch.iter_site_energy(site, components=cache):
+        return solar_batch.monthly_totals(energy_wh, times)[0] / 1000
+
+
+# Run _compute for key, joining an identical computation already in flight
+def _coalesced(key):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = executor.submit(_compute, key)
+            _inflight[key] = future
+            future.add_done_callback(lambda _: _forget(key))
+        else:
+            _count('coalesced')
+    return future.result()
+
+
+def _forget(key):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+
+def request_key(data):
+    latitude, longitude = cache.round(data['latitude'], data['longitude'])
+    return (latitude, longitude, int(data['year']),
+            round(float(data.get('tilt', 27)), 1), round(float(data.get('azimuth', 180)), 1))
+
+
+# Solar Estimate
+@app.route('/estimate', methods=['POST'])
+def estimate():
+    started = time.perf_counter()
+    _count('requests')
+    data = request.json or {}
+    try:
+        key = request_key(data)
+        factor = (float(data['roof_area']) * float(data['panel_efficiency']) / 100
+                  * float(data['performance_ratio']))
+    except (KeyError, TypeError, ValueError):
+        _count('errors')
+        return jsonify({"message": "latitude, longitude, year, roof_area, panel_efficiency "
+                                   "and performance_ratio are required numbers"}), 400
+
+    # Values that parse but that pandas/pvlib reject, e.g. a year outside
+    # the supported date range, raise ValueError from the computation
+    try:
+        monthly = _coalesced(key) * factor
+    except ValueError as e:
+        _count('errors')
+        return jsonify({"message": f"Cannot estimate this site: {e}"}), 400
+    except Exception:
+        _count('errors')
+        app.logger.exception("Solar estimate failed for %s", key)
+        return jsonify({"message": "Solar estimate failed"}), 500
+    _latencies.append(time.perf_counter() - started)
+    return jsonify({
+        "monthly_kwh": dict(zip(solar_batch.MONTHS, monthly.round(2).tolist())),
+        "annual_kwh": round(float(monthly.sum()), 2),
+    })
+
+
+# Latency percentiles and counters
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    latencies = np.array(_latencies)
+    with _metrics_lock:
+        body = dict(_counters)
+    body['in_flight'] = len(_inflight)
+    if len(latencies):
+        body['latency_ms'] = {
+            'p50': round(float(np.percentile(latencies, 50)) * 1000, 3),
+            'p99': round(float(np.percentile(latencies, 99)) * 1000, 3),
+            'samples': len(latencies),
+        }
+    return jsonify(body)
+
+
+# Build the first time grid and touch the cache so the first real request
+# does not pay for lazy setup inside pandas/pvlib
+def warm_up(year=None):
+    year = year or pd.Timestamp.now().year
+    _compute((26.91, 75.78, year, 27.0, 180.0))
+    with _metrics_lock:
+        _counters['computations'] = 0
+
+
+if __name__ == '__main__':
+    warm_up()
+    app.run(threaded=True)
@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import solar_batch
+import solar_profiling
+
+# -------------------------------
+# Sharded Multi-Process Runner
+# -------------------------------
+# Splits a site table into shards and scores them with solar_batch in a
+# process pool sized to the machine. Workers write their monthly totals (and
+# optionally the hourly energy) straight into .npy memory-mapped files at
+# their own row offsets, so nothing large is pickled back to the parent and
+# the result order always matches the input order.
+
+SHARDS_PER_WORKER = 4
+RETRIES = 2
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+# Default progress reporter: one line per finished shard on stderr
+def print_progress(done, total):
+    print(f"🔄 Shards complete: {done}/{total}", file=sys.stderr)
+
+
+# Worker body. Scores one shard and writes into the shared memmaps.
+def _run_shard(shard, rows, monthly_path, hourly_path, freq):
+    monthly = np.load(monthly_path, mmap_mode='r+')
+    hourly = np.load(hourly_path, mmap_mode='r+') if hourly_path else None
+    for positions, times, energy_wh in solar_batch.iter_site_energy(shard, freq=freq):
+        target = rows[positions]
+        monthly[target] = solar_batch.monthly_totals(energy_wh, times) / 1000
+        if hourly is not None:
+            hourly[target, :energy_wh.shape[1]] = energy_wh
+    monthly.flush()
+    if hourly is not None:
+        hourly.flush()
+    solar_profiling.profiler.flush()
+    return len(rows)
+
+
+# Score sites across a process pool. Returns the same table as
+# solar_batch.estimate_fleet. If hourly_path is given the hourly energy (Wh)
+# is kept there as a float32 (sites, hours) .npy, NaN-padded for short years.
+def estimate_fleet_sharded(sites, workers=None, shard_size=None, retries=RETRIES,
+                           progress=print_progress, hourly_path=None, freq='h'):
+    sites = solar_batch.validate_sites(sites)
+    workers = workers or os.cpu_count() or 1
+    count = len(sites)
+    if shard_size is None:
+        shard_size = max(1, -(-count // (workers * SHARDS_PER_WORKER)))
+
+    # Sort by location so sites that share a clear-sky run land in one shard
+    order = np.lexsort((sites['longitude'].to_numpy(), sites['latitude'].to_numpy(),
+                        sites['tz'].astype(str).to_numpy(), sites['year'].to_numpy()))
+    ordered = sites.iloc[order].reset_index(drop=True)
+    shards = [(start, order[start:start + shard_size])
+              for start in range(0, count, shard_size)]
+
+    with tempfile.TemporaryDirectory(prefix='solar_shard_') as scratch:
+        monthly_path = os.path.join(scratch, 'monthly.npy')
+        np.lib.format.open_memmap(monthly_path, mode='w+', dtype=np.float64,
+                                  shape=(count, 12))
+        if hourly_path:
+            grids = sites[['year', 'tz']].drop_duplicates().itertuples(index=False)
+            hours = max(len(solar_batch.hourly_times(int(year), tz, freq)) for year, tz in grids)
+            hourly = np.lib.format.open_memmap(hourly_path, mode='w+', dtype=np.float32,
+                                               shape=(count, hours))
+            hourly[:] = np.nan
+            hourly.flush()
+            del hourly
+
+        attempts = [0] * len(shards)
+        todo = list(range(len(shards)))
+        done = 0
+        while todo:
+            # A crashed worker breaks the whole pool, so every retry round
+            # gets a fresh one
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                futures = {}
+                for shard_id in todo:
+                    start, rows = shards[shard_id]
+                    shard = ordered.iloc[start:start + len(rows)]
+                    futures[pool.submit(_run_shard, shard, rows, monthly_path,
+                                        hourly_path, freq)] = shard_id
+                todo = []
+                for future in as_completed(futures):
+                    shard_id = futures[future]
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        attempts[shard_id] += 1
+                        if attempts[shard_id] > retries:
+                            raise ShardError(f"Shard {shard_id} failed after "
+                                             f"{attempts[shard_id]} attempts") from exc
+                        todo.append(shard_id)
+                        continue
+                    done += 1
+                    if progress:
+                        progress(done, len(shards))
+            todo.sort()
+
+        monthly = np.array(np.load(monthly_path, mmap_mode='r'))
+
+    return solar_batch.fleet_table(sites, monthly)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python solar_shard.py sites.csv|sites.parquet output.csv [workers]")
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    fleet = estimate_fleet_sharded(solar_batch.load_sites(sys.argv[1]), workers=workers)
+    fleet.to_csv(sys.argv[2], index=False)
+    print(f"📁 Estimates for {len(fleet)} sites exported to: {sys.argv[2]}")
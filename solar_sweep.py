@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+import numpy as np
+
+import solar_batch
+
+# -------------------------------
+# Tilt / Azimuth Optimisation Sweep
+# -------------------------------
+# Evaluates annual energy for a whole grid of panel orientations in one
+# broadcasted pass over the hourly clear-sky irradiance of a site, instead of
+# calling pvlib.irradiance.get_total_irradiance once per grid point.
+#
+# With the isotropic model used by solar_batch.plane_of_array, the yearly sum
+# splits into a diffuse part that only depends on tilt (two scalars per
+# year) and a beam part sum_h(dni_h * max(n . s_h, 0)), where n is the panel
+# normal and s_h the sun direction. The beam part is a matrix product of the
+# orientation normals with the daylight sun vectors, done in row blocks.
+
+SweepResult = namedtuple('SweepResult', ['tilts', 'azimuths', 'surface',
+                                         'best_tilt', 'best_azimuth', 'best_kwh'])
+
+BLOCK_SIZE = 4096
+
+
+def _unit_vectors(tilt, azimuth):
+    tilt = np.radians(tilt)
+    azimuth = np.radians(azimuth)
+    return np.stack([np.cos(tilt),
+                     np.sin(tilt) * np.cos(azimuth),
+                     np.sin(tilt) * np.sin(azimuth)], axis=-1)
+
+
+# Precompute the per-year quantities the surface needs
+def _prepare(components):
+    dni = np.asarray(components['dni'], dtype=np.float32)
+    sunlit = dni > 0
+    sun = _unit_vectors(np.asarray(components['zenith'], dtype=np.float32)[sunlit],
+                        np.asarray(components['azimuth'], dtype=np.float32)[sunlit])
+    return (sun.astype(np.float32), dni[sunlit],
+            float(np.sum(components['dhi'], dtype=np.float64)),
+            float(np.sum(components['ghi'], dtype=np.float64)))
+
+
+# Annual plane-of-array insolation (Wh/m²) for arrays of tilt and azimuth
+# of the same shape
+def _insolation(prepared, tilt, azimuth, albedo=solar_batch.ALBEDO):
+    sun, dni, dhi_sum, ghi_sum = prepared
+    tilt = np.asarray(tilt, dtype=float)
+    normals = _unit_vectors(tilt, np.asarray(azimuth, dtype=float)).reshape(-1, 3)
+    normals = normals.astype(np.float32)
+    beam = np.empty(len(normals))
+    for start in range(0, len(normals), BLOCK_SIZE):
+        projection = normals[start:start + BLOCK_SIZE] @ sun.T
+        np.maximum(projection, 0, out=projection)
+        beam[start:start + BLOCK_SIZE] = projection @ dni
+    cos_tilt = np.cos(np.radians(tilt))
+    diffuse = dhi_sum * (1 + cos_tilt) * 0.5 + ghi_sum * albedo * (1 - cos_tilt) * 0.5
+    return beam.reshape(tilt.shape) + diffuse
+
+
+# Annual kWh over a tilt x azimuth grid for one site. Returns the surface
+# (len(tilts), len(azimuths)) and its argmax; with refine=True the best grid
+# point is polished with a bounded Nelder-Mead search (needs scipy). The
+# time zone defaults to the one at the site.
+def sweep_orientation(latitude, longitude, year, roof_area=1.0, panel_efficiency=100.0,
+                      performance_ratio=1.0, tilts=None, azimuths=None, refine=False,
+                      tz=None, components=None):
+    tilts = np.arange(0, 91, 1.0) if tilts is None else np.asarray(tilts, dtype=float)
+    azimuths = np.arange(0, 361, 1.0) if azimuths is None else np.asarray(azimuths, dtype=float)
+    components = components or solar_batch.clearsky_components
+    tz = tz or solar_batch.timezone_at(latitude, longitude)
+    times = solar_batch.hourly_times(int(year), tz)
+    prepared = _prepare(components(times, latitude, longitude))
+    factor = (roof_area * panel_efficiency / 100 * performance_ratio
+              * solar_batch.step_hours(times) / 1000)
+
+    tilt_grid, azimuth_grid = np.meshgrid(tilts, azimuths, indexing='ij')
+    surface = _insolation(prepared, tilt_grid, azimuth_grid) * factor
+    i, j = np.unravel_index(np.argmax(surface), surface.shape)
+    best_tilt, best_azimuth, best_kwh = tilts[i], azimuths[j], surface[i, j]
+
+    if refine:
+        from scipy.optimize import minimize
+
+        def objective(x):
+            return -_insolation(prepared, x[:1], x[1:]).item() * factor
+
+        bounds = [(tilts.min(), tilts.max()), (azimuths.min(), azimuths.max())]
+        found = minimize(objective, [best_tilt, best_azimuth], method='Nelder-Mead',
+                         bounds=bounds, options={'xatol': 0.01, 'fatol': 1e-6})
+        if -found.fun > best_kwh:
+            best_tilt, best_azimuth = found.x
+            best_kwh = -found.fun
+
+    return SweepResult(tilts, azimuths, surface, float(best_tilt), float(best_azimuth),
+                       float(best_kwh))
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 4:
+        sys.exit("Usage: python solar_sweep.py latitude longitude year")
+    result = sweep_orientation(float(sys.argv[1]), float(sys.argv[2]), int(sys.argv[3]),
+                               refine=True)
+    print(f"🧭 Best Tilt                : {result.best_tilt:.1f}°")
+    print(f"🧭 Best Azimuth             : {result.best_azimuth:.1f}°")
+    print(f"🔆 Annual Insolation        : {result.best_kwh:.2f} kWh/m²")
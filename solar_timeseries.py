@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import solar_batch
+
+# -------------------------------
+# Hourly Solar Output Store
+# -------------------------------
+# Keeps the hourly energy_wh series that the estimators used to throw away
+# after resampling to months. Each site-year is one chunk directory:
+#   hourly.f32.z   - the full series, float32, zlib-compressed
+#   daily.npy, weekly.npy, monthly.npy
+#                  - precomputed float32 rollups, read memory-mapped
+#   meta.json      - year, tz and time step, enough to rebuild the index
+# Dashboards read the rollup level they need without decompressing the
+# hourly data and without re-running pvlib. The hourly series is only read
+# for drill-downs, a whole site-year at a time, and about half of it is
+# night-time zeros, so it is kept compressed (about half the size) rather
+# than memory-mapped like the rollups.
+
+LEVELS = ('daily', 'weekly', 'monthly')
+
+
+# Period start for every timestamp at one rollup level. Weeks start on
+# Monday, so the first and last week of a year can be partial.
+def _periods(times, level):
+    days = times.normalize()
+    if level == 'daily':
+        return days
+    if level == 'weekly':
+        return days - pd.to_timedelta(days.weekday, unit='D')
+    if level == 'monthly':
+        return days - pd.to_timedelta(days.day - 1, unit='D')
+    raise ValueError(f"Unknown level {level!r}, expected hourly, {', '.join(LEVELS)} or annual")
+
+
+def _rollup(values, times, level):
+    periods = _periods(times, level)
+    changes = np.r_[True, periods[1:] != periods[:-1]]
+    starts = np.flatnonzero(changes)
+    return np.add.reduceat(values.astype(np.float64), starts).astype(np.float32), periods[starts]
+
+
+class HourlyStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _chunk(self, site_id, year):
+        return os.path.join(self.root, str(site_id), str(int(year)))
+
+    # Store one site-year of energy (Wh per time step) with its rollups
+    def write(self, site_id, year, energy_wh, tz='UTC', freq='h'):
+        times = solar_batch.hourly_times(int(year), tz, freq)
+        values = np.asarray(energy_wh, dtype=np.float32)
+        if values.shape != (len(times),):
+            raise ValueError(f"Expected {len(times)} values for {year} at {freq}, got {values.shape}")
+
+        chunk = self._chunk(site_id, year)
+        os.makedirs(os.path.dirname(chunk), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(chunk), prefix='.tmp-')
+        with open(os.path.join(staging, 'hourly.f32.z'), 'wb') as f:
+            f.write(zlib.compress(values.tobytes(), 6))
+        for level in LEVELS:
+            np.save(os.path.join(staging, f'{level}.npy'), _rollup(values, times, level)[0])
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'year': int(year), 'tz': tz, 'freq': freq}, f)
+        if os.path.exists(chunk):
+            shutil.rmtree(chunk)
+        os.rename(staging, chunk)
+
+    def meta(self, site_id, year):
+        with open(os.path.join(self._chunk(site_id, year), 'meta.json')) as f:
+            return json.load(f)
+
+    def sites(self):
+        return sorted(name for name in os.listdir(self.root) if not name.startswith('.'))
+
+    def years(self, site_id):
+        path = os.path.join(self.root, str(site_id))
+        return sorted(int(name) for name in os.listdir(path) if name.isdigit())
+
+    # Energy (Wh) at one level: hourly, daily, weekly, monthly or annual,
+    # optionally sliced to [start, end]
+    def read(self, site_id, year, level='daily', start=None, end=None):
+        chunk = self._chunk(site_id, year)
+        meta = self.meta(site_id, year)
+        times = solar_batch.hourly_times(meta['year'], meta['tz'], meta['freq'])
+        if level == 'hourly':
+            with open(os.path.join(chunk, 'hourly.f32.z'), 'rb') as f:
+                values = np.frombuffer(zlib.decompress(f.read()), dtype=np.float32)
+            index = times
+        elif level == 'annual':
+            monthly = np.load(os.path.join(chunk, 'monthly.npy'), mmap_mode='r')
+            values, index = np.array([monthly.sum(dtype=np.float64)]), times[:1].normalize()
+        else:
+            values = np.load(os.path.join(chunk, f'{level}.npy'), mmap_mode='r')
+            index = pd.DatetimeIndex(pd.unique(_periods(times, level)))
+        series = pd.Series(values, index=index, name='energy_wh')
+        return series.loc[start:end] if start is not None or end is not None else series
+
+
+# Score a site table with solar_batch and keep every site's hourly series.
+# Sites are keyed by a 'site_id' column if the table has one, otherwise by
+# row position.
+def store_fleet(sites, store, chunk_size=solar_batch.CHUNK_SIZE, components=None, freq='h'):
+    sites = solar_batch.validate_sites(sites).reset_index(drop=True)
+    ids = sites['site_id'] if 'site_id' in sites.columns else sites.index
+    for positions, times, energy_wh in solar_batch.iter_site_energy(sites, chunk_size,
+                                                                    components, freq):
+        freq = times.freqstr
+        for position, values in zip(positions, energy_wh):
+            store.write(ids[position], sites.at[position, 'year'], values,
+                        tz=sites.at[position, 'tz'], freq=freq)
+    return store
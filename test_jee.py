@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+os.environ['MOOD_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import pytest
+from sqlalchemy import text
+
+import jee
+
+
+@pytest.fixture
+def client():
+    with jee.app.app_context():
+        jee.db.drop_all()
+        jee.db.create_all()
+        jee.db.session.add(jee.User(username='alice', password='x'))
+        jee.db.session.commit()
+    jee.user_ids.invalidate()
+    return jee.app.test_client()
+
+
+# Rows written by the old CURRENT_TIMESTAMP default mixed with newer rows,
+# several in the same second: paging must visit each row once and end
+def test_mood_history_pages_through_legacy_rows(client):
+    with jee.app.app_context():
+        for timestamp in ('2024-01-01 10:00:00', '2024-01-01 10:00:00', '2024-01-01 10:00:01'):
+            jee.db.session.execute(text("INSERT INTO mood_log (user_id, mood, timestamp) "
+                                        "VALUES (1, 'legacy', :timestamp)"),
+                                   {'timestamp': timestamp})
+        jee.db.session.commit()
+        jee.insert_moods([{'user_id': 1, 'mood': 'new', 'timestamp': jee.parse_timestamp(value)}
+                          for value in ('2024-01-01T10:00:00', '2024-01-01T10:00:00.5')])
+        jee.init_db()
+
+    seen, cursor = [], None
+    for _ in range(10):
+        query = {'limit': 2, 'cursor': cursor} if cursor else {'limit': 2}
+        response = client.get('/mood_history/alice', query_string=query)
+        assert response.status_code == 200
+        seen += [entry['id'] for entry in response.json['entries']]
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            break
+    assert cursor is None
+    assert sorted(seen) == [1, 2, 3, 4, 5]
+    assert seen == [3, 5, 4, 2, 1]
@@ -0,0 +1,47 @@
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import solar_batch
+from solar_timezone import check_index, timezone_at
+
+# Poles, the antimeridian and the far edge of a 1° cell
+EDGE_CASES = [(90, 0), (-90, 0), (90, 180), (-90, -180), (0, 180), (0, -180),
+              (89.99999, 179.99999), (-89.99999, -179.99999)]
+
+
+@pytest.mark.parametrize('latitude, longitude', EDGE_CASES)
+def test_edge_cases_resolve_to_a_zone(latitude, longitude):
+    name = timezone_at(latitude, longitude)
+    assert ZoneInfo(name).key == name
+
+
+def test_arrays_match_scalar_lookups():
+    latitudes, longitudes = np.array(EDGE_CASES, dtype=float).T
+    names = timezone_at(latitudes, longitudes)
+    assert names.shape == latitudes.shape
+    assert list(names) == [timezone_at(lat, lon) for lat, lon in EDGE_CASES]
+
+
+def test_known_sites():
+    assert timezone_at(26.91, 75.78) == 'Asia/Kolkata'
+    assert list(timezone_at([51.5, 40.7], [-0.12, -74.0])) == ['Europe/London',
+                                                              'America/New_York']
+
+
+@pytest.mark.parametrize('latitude', [np.nan, np.inf])
+def test_validate_sites_rejects_non_finite_coordinates(latitude):
+    sites = pd.DataFrame([{'latitude': latitude, 'longitude': 75.78, 'roof_area': 100,
+                           'panel_efficiency': 18, 'performance_ratio': 0.75, 'year': 2024,
+                           'tilt': 27, 'azimuth': 180}])
+    with pytest.raises(ValueError):
+        solar_batch.validate_sites(sites)
+
+
+def test_index_agrees_with_polygons():
+    pytest.importorskip('timezonefinder')
+    overall, land = check_index(samples=2000)
+    assert overall > 0.99
+    assert land > 0.99